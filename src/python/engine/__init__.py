@@ -1,2 +1,3 @@
 from .evaluation.evaluation import evaluate_position, count_material
+from .board import SearchBoard
 from .search import find_best_move, negamax_alpha_beta, order_moves, quiescence_search
@@ -0,0 +1,236 @@
+#board.py
+import chess
+import chess.polyglot
+
+from engine.evaluation.PSTs import material_and_pst_scores
+
+
+POLYGLOT_RANDOM = chess.polyglot.POLYGLOT_RANDOM_ARRAY
+ZOBRIST_TURN = POLYGLOT_RANDOM[780]
+ZOBRIST_EP_FILE = POLYGLOT_RANDOM[772:780]
+
+# ZOBRIST_PIECES[color][piece_type][square], laid out exactly like the polyglot random array
+ZOBRIST_PIECES = [
+    [[0] * 64] + [[POLYGLOT_RANDOM[64 * ((piece_type - 1) * 2 + color) + square] for square in chess.SQUARES] for piece_type in chess.PIECE_TYPES]
+    for color in (chess.BLACK, chess.WHITE)
+]
+
+# Polyglot castling keys, indexed by the rook squares kept in clean_castling_rights()
+ZOBRIST_CASTLING = (
+    (chess.BB_H1, POLYGLOT_RANDOM[768]),
+    (chess.BB_A1, POLYGLOT_RANDOM[769]),
+    (chess.BB_H8, POLYGLOT_RANDOM[770]),
+    (chess.BB_A8, POLYGLOT_RANDOM[771]),
+)
+
+
+def castling_key(castling_rights):
+    """
+    Zobrist contribution of a (clean) castling rights bitmask.
+    :param castling_rights: Bitmask of rook squares with castling rights, as returned by clean_castling_rights()
+    :return: The xor of the polyglot castling keys for those rights
+    """
+    key = 0
+    for rook_square, random_key in ZOBRIST_CASTLING:
+        if castling_rights & rook_square:
+            key ^= random_key
+    return key
+
+
+def pawn_zobrist_key(board, squares=chess.BB_ALL):
+    """
+    Zobrist key of the pawns alone, the key of the pawn hash table (see engine/evaluation/pawn_structure.py).
+    :param board: The chess board
+    :param squares: Bitmask of the squares to include, the whole board by default
+    :return: The xor of the polyglot piece keys of the pawns on those squares
+    """
+    pawns = squares & board.pawns
+    if not pawns:
+        return 0
+    key = 0
+    occupied_white = board.occupied_co[chess.WHITE]
+    for square in chess.scan_forward(pawns):
+        key ^= ZOBRIST_PIECES[bool(occupied_white & chess.BB_SQUARES[square])][chess.PAWN][square]
+    return key
+
+
+class SearchBoard(chess.Board):
+    """
+    chess.Board used by the search. It keeps a Zobrist key that is updated incrementally by make_move and
+    restored by unmake_move, instead of recomputing chess.polyglot.zobrist_hash from the full piece map.
+
+    The key is identical to the polyglot hash (pieces, castling rights, en passant file and side to move),
+    and the keys of all earlier positions are kept in zobrist_history, oldest first. That history also drives
+    the repetition detection, which replaces the replay done by can_claim_threefold_repetition.
+    Only standard chess is updated incrementally; chess960 boards fall back to a full rehash.
+
+    The material plus piece-square table scores and the game phase (see material_and_pst_scores) are kept the same
+    way in psqt_scores, with the earlier values in psqt_history, so the evaluation does not have to scan the board for them.
+    So is the Zobrist key of the pawns alone, in pawn_key and pawn_key_history, for the pawn hash table.
+
+    The search must use make_move/unmake_move. Plain push/pop are left untouched so python-chess internals
+    that push and pop temporarily (gives_check, san, is_repetition, ...) stay as cheap as before.
+    """
+
+    @classmethod
+    def from_board(cls, board):
+        """
+        Build a SearchBoard from any chess.Board, replaying its move stack so the key history covers the whole game.
+        """
+        root = board.root()
+        search_board = cls(root.fen(), chess960=board.chess960)
+        for move in board.move_stack:
+            search_board.make_move(move)
+        return search_board
+
+    def clear_stack(self):
+        super().clear_stack()
+        self.zobrist_key = chess.polyglot.zobrist_hash(self)
+        self.zobrist_history = []
+        self.psqt_scores = material_and_pst_scores(self)
+        self.psqt_history = []
+        self.pawn_key = pawn_zobrist_key(self)
+        self.pawn_key_history = []
+        self.null_move_plies = []
+        self.search_root_ply = 0
+
+    def copy(self, *, stack=True):
+        board = super().copy(stack=stack)
+        board.zobrist_key = self.zobrist_key
+        kept = len(board.move_stack)
+        dropped = len(self.zobrist_history) - kept
+        board.zobrist_history = self.zobrist_history[dropped:] if kept else []
+        board.psqt_scores = self.psqt_scores
+        board.psqt_history = self.psqt_history[dropped:] if kept else []
+        board.pawn_key = self.pawn_key
+        board.pawn_key_history = self.pawn_key_history[dropped:] if kept else []
+        board.search_root_ply = max(0, self.search_root_ply - dropped)
+        board.null_move_plies = [ply - dropped for ply in self.null_move_plies if ply >= dropped] if kept else []
+        return board
+
+    def mark_search_root(self):
+        """
+        Remember the current position as the root of the search. Repetitions of positions after this point
+        count as a draw the first time they occur, see is_repetition_draw.
+        """
+        self.search_root_ply = len(self.zobrist_history)
+
+    def is_repetition_draw(self):
+        """
+        Check whether the current position repeats an earlier one, using only the key history.
+
+        Only positions since the last irreversible move (tracked by the halfmove clock) with the same side to move
+        are scanned, and never past a null move made by the search. A single repetition of a position inside the search tree is scored as a draw, since the side
+        that can repeat once can repeat again. Positions from before the root need two earlier occurrences,
+        which is a real threefold repetition.
+        :return: True if the position should be scored as a draw by repetition
+        """
+        history = self.zobrist_history
+        key = self.zobrist_key
+        current_ply = len(history)
+        oldest_ply = max(current_ply - self.halfmove_clock, 0)
+        if self.null_move_plies:
+            # Positions before a null move cannot be reached again by real moves
+            oldest_ply = max(oldest_ply, self.null_move_plies[-1] + 1)
+        repetitions = 0
+        for ply in range(current_ply - 4, oldest_ply - 1, -2):
+            if history[ply] == key:
+                if ply >= self.search_root_ply:
+                    return True
+                repetitions += 1
+                if repetitions >= 2:
+                    return True
+        return False
+
+    def is_fifty_moves_draw(self):
+        """
+        Check the fifty-move rule from the halfmove clock alone. Checkmate on the last move has to be ruled out by the caller.
+        """
+        return self.halfmove_clock >= 100
+
+    def _ep_key(self):
+        # Same rule as polyglot: the en passant file only counts if a pawn of the side to move could capture
+        ep_square = self.ep_square
+        if ep_square is None:
+            return 0
+        if self.turn == chess.WHITE:
+            ep_mask = chess.shift_down(chess.BB_SQUARES[ep_square])
+        else:
+            ep_mask = chess.shift_up(chess.BB_SQUARES[ep_square])
+        ep_mask = chess.shift_left(ep_mask) | chess.shift_right(ep_mask)
+        if ep_mask & self.pawns & self.occupied_co[self.turn]:
+            return ZOBRIST_EP_FILE[ep_square & 7]
+        return 0
+
+    def _pieces_key(self, squares):
+        key = 0
+        occupied_white = self.occupied_co[chess.WHITE]
+        for square in chess.scan_forward(squares & self.occupied):
+            color = bool(occupied_white & chess.BB_SQUARES[square])
+            key ^= ZOBRIST_PIECES[color][self.piece_type_at(square)][square]
+        return key
+
+    def make_move(self, move):
+        """
+        Push a move (or a null move) and update the Zobrist keys, the material and piece-square table scores and the game phase incrementally.
+        """
+        key = self.zobrist_key
+        if not move:
+            self.null_move_plies.append(len(self.zobrist_history))
+        self.zobrist_history.append(key)
+        self.psqt_history.append(self.psqt_scores)
+        self.pawn_key_history.append(self.pawn_key)
+
+        if self.chess960:
+            self.push(move)
+            self.zobrist_key = chess.polyglot.zobrist_hash(self)
+            self.psqt_scores = material_and_pst_scores(self)
+            self.pawn_key = pawn_zobrist_key(self)
+            return
+
+        changed_squares = 0
+        if move:
+            from_square = move.from_square
+            to_square = move.to_square
+            changed_squares = chess.BB_SQUARES[from_square] | chess.BB_SQUARES[to_square]
+            piece_type = self.piece_type_at(from_square)
+            if piece_type == chess.KING:
+                if abs((from_square & 7) - (to_square & 7)) > 1 or self.occupied_co[self.turn] & chess.BB_SQUARES[to_square]:
+                    # Castling: the rook moves as well
+                    changed_squares |= chess.BB_RANK_1 if self.turn == chess.WHITE else chess.BB_RANK_8
+            elif piece_type == chess.PAWN and to_square == self.ep_square and (from_square & 7) != (to_square & 7):
+                changed_squares |= chess.BB_SQUARES[to_square - 8 if self.turn == chess.WHITE else to_square + 8]
+            key ^= self._pieces_key(changed_squares)
+            opening_before, midgame_before, endgame_before, phase_before = material_and_pst_scores(self, changed_squares)
+            pawn_key = self.pawn_key ^ pawn_zobrist_key(self, changed_squares)
+
+        key ^= self._ep_key()
+        castling_before = castling_key(self.clean_castling_rights()) if self.castling_rights else None
+
+        self.push(move)
+
+        if changed_squares:
+            key ^= self._pieces_key(changed_squares)
+            opening_after, midgame_after, endgame_after, phase_after = material_and_pst_scores(self, changed_squares)
+            self.pawn_key = pawn_key ^ pawn_zobrist_key(self, changed_squares)
+            opening, midgame, endgame, phase = self.psqt_scores
+            self.psqt_scores = (opening - opening_before + opening_after,
+                                midgame - midgame_before + midgame_after,
+                                endgame - endgame_before + endgame_after,
+                                phase - phase_before + phase_after)
+        key ^= self._ep_key()
+        if castling_before is not None:
+            key ^= castling_before ^ castling_key(self.castling_rights)
+        self.zobrist_key = key ^ ZOBRIST_TURN
+
+    def unmake_move(self):
+        """
+        Pop the last move pushed with make_move and restore the previous Zobrist keys, scores and game phase.
+        """
+        move = self.pop()
+        self.zobrist_key = self.zobrist_history.pop()
+        self.psqt_scores = self.psqt_history.pop()
+        self.pawn_key = self.pawn_key_history.pop()
+        if not move:
+            self.null_move_plies.pop()
+        return move
@@ -1,6 +1,7 @@
 import chess
 
-from utils.game_phase import PHASE_OPENING, PHASE_MIDGAME, PHASE_ENDGAME
+from utils.game_phase import PHASE_OPENING, PHASE_MIDGAME, PHASE_ENDGAME, PHASE_WEIGHTS
+from utils.constants import PIECE_VALUES
 
 
 
@@ -166,3 +167,68 @@ def get_piece_square_tables_by_phase(phase: str):
         }
     else:
         raise ValueError("Invalid phase. Must be 'opening', 'midgame', or 'endgame'.")
+
+
+# The phases in the order of the components of material_and_pst_scores
+PHASES = (PHASE_OPENING, PHASE_MIDGAME, PHASE_ENDGAME)
+
+
+def piece_code(color, piece_type):
+    """
+    Index of a piece in the flat tables: 0 to 5 for the white pawn to king, 6 to 11 for the black ones.
+    """
+    return piece_type - 1 if color == chess.WHITE else piece_type + 5
+
+
+def build_flat_table(phase):
+    """
+    Merge the piece values and piece-square tables of a phase into one flat list of 12 * 64 entries, indexed by
+    piece_code(color, piece_type) * 64 + square. Black entries are mirrored and negated, so the sum over all pieces is
+    the score from white's point of view.
+    """
+    tables = get_piece_square_tables_by_phase(phase)
+    flat_table = [0] * (12 * 64)
+    for color in chess.COLORS:
+        for piece_type in chess.PIECE_TYPES:
+            base = piece_code(color, piece_type) * 64
+            for square in chess.SQUARES:
+                if color == chess.WHITE:
+                    flat_table[base + square] = PIECE_VALUES[piece_type] + tables[piece_type][square]
+                else:
+                    flat_table[base + square] = -(PIECE_VALUES[piece_type] + tables[piece_type][chess.square_mirror(square)])
+    return flat_table
+
+
+# Built once at import. Plain lists, since indexing an array.array boxes a new int on every lookup
+FLAT_TABLE_OPENING, FLAT_TABLE_MIDGAME, FLAT_TABLE_ENDGAME = (build_flat_table(phase) for phase in PHASES)
+
+
+def material_and_pst_scores(board, squares=chess.BB_ALL):
+    """
+    Material plus piece-square table score of the pieces on the given squares, from white's point of view, and their
+    weight in the game phase. SearchBoard keeps these up to date for the whole board by calling this for the squares a
+    move changes.
+    :param board: The chess board
+    :param squares: Bitmask of the squares to count, the whole board by default
+    :return: A tuple (opening, midgame, endgame, phase) with the score for each phase in PHASES and the summed PHASE_WEIGHTS
+    """
+    opening = midgame = endgame = phase = 0
+    squares &= board.occupied
+    white_squares = squares & board.occupied_co[chess.WHITE]
+    black_squares = squares & board.occupied_co[chess.BLACK]
+    for base, pieces in enumerate((board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings)):
+        pieces &= squares
+        if not pieces:
+            continue
+        phase += PHASE_WEIGHTS[base + 1] * pieces.bit_count()
+        index = base * 64
+        for square in chess.scan_forward(pieces & white_squares):
+            opening += FLAT_TABLE_OPENING[index + square]
+            midgame += FLAT_TABLE_MIDGAME[index + square]
+            endgame += FLAT_TABLE_ENDGAME[index + square]
+        index += 6 * 64
+        for square in chess.scan_forward(pieces & black_squares):
+            opening += FLAT_TABLE_OPENING[index + square]
+            midgame += FLAT_TABLE_MIDGAME[index + square]
+            endgame += FLAT_TABLE_ENDGAME[index + square]
+    return opening, midgame, endgame, phase
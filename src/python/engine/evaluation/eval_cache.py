@@ -0,0 +1,79 @@
+#eval_cache.py
+from utils.log import logger
+from utils.debug_config import get_debug_config
+from utils.config import get_eval_cache_entries
+
+
+debug_evaluation = get_debug_config("evaluation")
+
+# Mixed into the key during the first OPENING_MOVES moves, where the evaluation uses the opening tables, since the
+# Zobrist key does not tell those positions apart from the same ones later in the game
+OPENING_KEY = 0x9E3779B97F4A7C15
+
+
+class EvalCache:
+    """
+    Fixed-size table of static evaluations, keyed by the Zobrist key of the position. Quiescence search evaluates
+    the same positions over and over, in sibling subtrees and again in every iteration, and the more terms the
+    evaluation gets the more a hit saves.
+
+    Every slot holds one (key, score) tuple and is simply overwritten by the next position that maps to it. A slot is
+    replaced as a whole, so threads sharing the cache never read a key with the score of another one.
+    """
+
+    def __init__(self, num_entries):
+        """
+        :param num_entries: The number of slots
+        """
+        self.num_entries = max(1, num_entries)
+        self.entries = [None] * self.num_entries
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        self.entries = [None] * self.num_entries
+        self.new_search()
+
+    def new_search(self):
+        """
+        Reset the hit and miss counters. The entries stay valid, a position always gets the same evaluation.
+        """
+        self.hits = 0
+        self.misses = 0
+
+    def probe(self, key):
+        """
+        Look up a position.
+        :param key: The Zobrist key of the position
+        :return: The stored score, or None if the position is not stored
+        """
+        entry = self.entries[key % self.num_entries]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def store(self, key, score):
+        """
+        Store the evaluation of a position.
+        :param key: The Zobrist key of the position
+        :param score: The score, as returned by evaluate_position
+        """
+        self.entries[key % self.num_entries] = (key, score)
+
+
+eval_cache = None
+
+
+def get_eval_cache():
+    """
+    Get the evaluation cache of this process, (re)allocating it if the configured size has changed.
+    """
+    global eval_cache
+    num_entries = get_eval_cache_entries()
+    if eval_cache is None or eval_cache.num_entries != num_entries:
+        eval_cache = EvalCache(num_entries)
+        if debug_evaluation:
+            logger.debug(f"Evaluation cache allocated: {num_entries} entries")
+    return eval_cache
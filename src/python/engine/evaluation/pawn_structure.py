@@ -0,0 +1,195 @@
+#pawn_structure.py
+import chess
+
+from utils.log import logger
+from utils.debug_config import get_debug_config
+from utils.config import get_pawn_hash_entries
+from utils.constants import PASSED_PAWN_BONUS_BY_RANK
+
+
+debug_evaluation = get_debug_config("evaluation")
+
+ISOLATED_PAWN_PENALTY = -15
+DOUBLED_PAWN_PENALTY = -20  # for every pawn on a file after the first
+BACKWARD_PAWN_PENALTY = -20
+PAWN_ISLAND_PENALTY = -10  # for every group of pawns on adjacent files
+PAWN_CHAIN_BASE_BONUS = 10  # for every pawn protected by another pawn
+PAWN_CHAIN_HEAD_BONUS = 5  # on top of that if the protecting pawn is protected as well
+# Passed pawn bonuses are scaled by these for protected and connected passers, and by the share in the middlegame
+PROTECTED_PASSER_FACTOR = 1.5
+CONNECTED_PASSER_FACTOR = 2
+PROTECTED_CONNECTED_PASSER_FACTOR = 2.5
+PASSED_PAWN_MIDGAME_SHARE = 0.75
+
+ADJACENT_FILES = [
+    (chess.BB_FILES[file - 1] if file > 0 else 0) | (chess.BB_FILES[file + 1] if file < 7 else 0)
+    for file in range(8)
+]
+
+# FORWARD_RANKS[color][rank]: all ranks in front of the rank, seen from color
+FORWARD_RANKS = [
+    [(1 << (8 * rank)) - 1 for rank in range(8)],
+    [(chess.BB_ALL << (8 * (rank + 1))) & chess.BB_ALL for rank in range(8)],
+]
+
+# PASSED_PAWN_MASKS[color][square]: squares in front of a pawn, on its own and the adjacent files, that must hold no
+# enemy pawn for it to be passed
+PASSED_PAWN_MASKS = [
+    [(chess.BB_FILES[square & 7] | ADJACENT_FILES[square & 7]) & FORWARD_RANKS[color][square >> 3] for square in chess.SQUARES]
+    for color in (chess.BLACK, chess.WHITE)
+]
+
+# SUPPORT_MASKS[color][square]: squares on the adjacent files, level with a pawn or behind it, that hold the own pawns
+# which can still come up to protect it
+SUPPORT_MASKS = [
+    [ADJACENT_FILES[square & 7] & ~FORWARD_RANKS[color][square >> 3] for square in chess.SQUARES]
+    for color in (chess.BLACK, chess.WHITE)
+]
+
+
+def pawn_attacks(color, pawns):
+    """
+    Bitboard of all squares attacked by the given pawns of a color.
+    """
+    if color == chess.WHITE:
+        return (((pawns & ~chess.BB_FILE_A) << 7) | ((pawns & ~chess.BB_FILE_H) << 9)) & chess.BB_ALL
+    return ((pawns & ~chess.BB_FILE_A) >> 9) | ((pawns & ~chess.BB_FILE_H) >> 7)
+
+
+def evaluate_pawns_of_color(color, own_pawns, enemy_pawns):
+    """
+    Score the pawn structure of one side.
+    :param color: The side to score
+    :param own_pawns: Bitboard of the pawns of that side
+    :param enemy_pawns: Bitboard of the pawns of the other side
+    :return: A tuple (midgame, endgame) with the score for that side
+    """
+    score = 0
+    passed_score_midgame = 0
+    passed_score_endgame = 0
+
+    # Pawn chains
+    protected = own_pawns & pawn_attacks(color, own_pawns)
+    score += PAWN_CHAIN_BASE_BONUS * protected.bit_count()
+    score += PAWN_CHAIN_HEAD_BONUS * (protected & pawn_attacks(color, protected)).bit_count()
+
+    # Doubled and isolated pawns, and the files with pawns for the islands
+    occupied_files = 0
+    for file in range(8):
+        pawns_on_file = own_pawns & chess.BB_FILES[file]
+        if not pawns_on_file:
+            continue
+        occupied_files |= 1 << file
+        count = pawns_on_file.bit_count()
+        score += DOUBLED_PAWN_PENALTY * (count - 1)
+        if not own_pawns & ADJACENT_FILES[file]:
+            score += ISOLATED_PAWN_PENALTY * count
+    # An island starts at every occupied file whose left neighbour is empty
+    score += PAWN_ISLAND_PENALTY * (occupied_files & ~(occupied_files << 1)).bit_count()
+
+    enemy_attacks = pawn_attacks(not color, enemy_pawns)
+    passers = 0
+    for square in chess.scan_forward(own_pawns):
+        if not enemy_pawns & PASSED_PAWN_MASKS[color][square]:
+            passers |= chess.BB_SQUARES[square]
+            continue
+        # Backward: no own pawn can come up to protect it, and its stop square is held by an enemy pawn
+        file = square & 7
+        stop_square = square + 8 if color == chess.WHITE else square - 8
+        if (own_pawns & ADJACENT_FILES[file] and not own_pawns & SUPPORT_MASKS[color][square]
+                and enemy_attacks & chess.BB_SQUARES[stop_square]):
+            score += BACKWARD_PAWN_PENALTY
+
+    for square in chess.scan_forward(passers):
+        relative_rank = chess.square_rank(square) + 1 if color == chess.WHITE else 8 - chess.square_rank(square)
+        bonus = PASSED_PAWN_BONUS_BY_RANK[relative_rank]
+        is_protected = protected & chess.BB_SQUARES[square]
+        is_connected = passers & ADJACENT_FILES[square & 7]
+        if is_protected and is_connected:
+            bonus *= PROTECTED_CONNECTED_PASSER_FACTOR
+        elif is_protected:
+            bonus *= PROTECTED_PASSER_FACTOR
+        elif is_connected:
+            bonus *= CONNECTED_PASSER_FACTOR
+        passed_score_midgame += bonus * PASSED_PAWN_MIDGAME_SHARE
+        passed_score_endgame += bonus
+
+    return score + int(passed_score_midgame), score + int(passed_score_endgame)
+
+
+def evaluate_pawn_structure(white_pawns, black_pawns):
+    """
+    Score the pawn structure: passed pawns (more for protected and connected passers), pawn chains, and penalties
+    for isolated, doubled and backward pawns and for pawn islands. Everything is done with masks on the pawn
+    bitboards, so the result only depends on the pawns and can be cached by their Zobrist key.
+    :param white_pawns: Bitboard of the white pawns
+    :param black_pawns: Bitboard of the black pawns
+    :return: A tuple (midgame, endgame) with the score from white's point of view
+    """
+    white_midgame, white_endgame = evaluate_pawns_of_color(chess.WHITE, white_pawns, black_pawns)
+    black_midgame, black_endgame = evaluate_pawns_of_color(chess.BLACK, black_pawns, white_pawns)
+    return white_midgame - black_midgame, white_endgame - black_endgame
+
+
+class PawnHashTable:
+    """
+    Fixed-size table of pawn structure scores, keyed by the Zobrist key of the pawns alone (see pawn_zobrist_key in
+    engine/board.py). The pawns change in few of the moves in the tree, so most lookups hit.
+
+    Every slot holds one (key, midgame, endgame) tuple. A slot is replaced as a whole, so threads sharing the table
+    never read a key with the scores of another one.
+    """
+
+    def __init__(self, num_entries):
+        """
+        :param num_entries: The number of slots
+        """
+        self.num_entries = max(1, num_entries)
+        self.entries = [None] * self.num_entries
+        self.probes = 0
+        self.hits = 0
+
+    def clear(self):
+        self.entries = [None] * self.num_entries
+        self.new_search()
+
+    def new_search(self):
+        """
+        Reset the hit counters. The entries stay valid, a pawn structure always gets the same score.
+        """
+        self.probes = 0
+        self.hits = 0
+
+    def scores(self, pawn_key, white_pawns, black_pawns):
+        """
+        Look up the pawn structure score, computing and storing it on a miss.
+        :param pawn_key: The Zobrist key of the pawns
+        :param white_pawns: Bitboard of the white pawns
+        :param black_pawns: Bitboard of the black pawns
+        :return: A tuple (midgame, endgame) as returned by evaluate_pawn_structure
+        """
+        self.probes += 1
+        index = pawn_key % self.num_entries
+        entry = self.entries[index]
+        if entry is not None and entry[0] == pawn_key:
+            self.hits += 1
+            return entry[1], entry[2]
+        midgame, endgame = evaluate_pawn_structure(white_pawns, black_pawns)
+        self.entries[index] = (pawn_key, midgame, endgame)
+        return midgame, endgame
+
+
+pawn_hash_table = None
+
+
+def get_pawn_hash_table():
+    """
+    Get the pawn hash table of this process, (re)allocating it if the configured size has changed.
+    """
+    global pawn_hash_table
+    num_entries = get_pawn_hash_entries()
+    if pawn_hash_table is None or pawn_hash_table.num_entries != num_entries:
+        pawn_hash_table = PawnHashTable(num_entries)
+        if debug_evaluation:
+            logger.debug(f"Pawn hash table allocated: {num_entries} entries")
+    return pawn_hash_table
@@ -0,0 +1,91 @@
+#see.py
+import chess
+
+from utils.constants import PIECE_VALUES
+
+
+# Piece values for the exchange, indexed by piece type (index 0 is "no piece")
+SEE_PIECE_VALUES = [0] + [PIECE_VALUES[piece_type] for piece_type in chess.PIECE_TYPES]
+SEE_PIECE_VALUES[chess.KING] = 20000
+
+
+def attackers_to(board, square, occupied):
+    """
+    Bitboard of all pieces of both colours attacking a square, given an occupancy.
+    Passing an occupancy with pieces removed reveals the sliders behind them (x-ray attackers).
+    """
+    rank_pieces = chess.BB_RANK_MASKS[square] & occupied
+    file_pieces = chess.BB_FILE_MASKS[square] & occupied
+    diag_pieces = chess.BB_DIAG_MASKS[square] & occupied
+    queens = board.queens
+    return (
+        (chess.BB_KNIGHT_ATTACKS[square] & board.knights)
+        | (chess.BB_KING_ATTACKS[square] & board.kings)
+        | (chess.BB_PAWN_ATTACKS[chess.BLACK][square] & board.pawns & board.occupied_co[chess.WHITE])
+        | (chess.BB_PAWN_ATTACKS[chess.WHITE][square] & board.pawns & board.occupied_co[chess.BLACK])
+        | ((chess.BB_RANK_ATTACKS[square][rank_pieces] | chess.BB_FILE_ATTACKS[square][file_pieces]) & (board.rooks | queens))
+        | (chess.BB_DIAG_ATTACKS[square][diag_pieces] & (board.bishops | queens))
+    )
+
+
+def static_exchange_evaluation(board, move):
+    """
+    Static Exchange Evaluation: the material balance of the capture sequence started by a move on its target square,
+    with both sides always recapturing with their least valuable attacker and allowed to stop when it stops paying.
+    Sliding pieces behind other attackers (x-rays) join in as the pieces in front of them are used up.
+    :param board: The chess board, with the move not yet played
+    :param move: The capture (or promotion) to evaluate
+    :return: The expected material gain in centipawns for the side making the move. Negative means the capture loses material.
+    """
+    from_square = move.from_square
+    to_square = move.to_square
+    to_bb = chess.BB_SQUARES[to_square]
+    occupied = board.occupied ^ chess.BB_SQUARES[from_square]
+
+    attacker_type = board.piece_type_at(from_square)
+    victim_type = board.piece_type_at(to_square)
+    if victim_type is None and attacker_type == chess.PAWN and (from_square & 7) != (to_square & 7):
+        # En passant: the captured pawn is not on the target square
+        victim_type = chess.PAWN
+        occupied ^= chess.BB_SQUARES[to_square - 8 if board.turn == chess.WHITE else to_square + 8]
+
+    gain = [SEE_PIECE_VALUES[victim_type or 0]]
+    piece_on_square_value = SEE_PIECE_VALUES[attacker_type]
+    if move.promotion:
+        gain[0] += SEE_PIECE_VALUES[move.promotion] - SEE_PIECE_VALUES[chess.PAWN]
+        piece_on_square_value = SEE_PIECE_VALUES[move.promotion]
+
+    attackers = attackers_to(board, to_square, occupied) & ~to_bb
+    side = not board.turn
+    piece_masks = (
+        (chess.PAWN, board.pawns),
+        (chess.KNIGHT, board.knights),
+        (chess.BISHOP, board.bishops),
+        (chess.ROOK, board.rooks),
+        (chess.QUEEN, board.queens),
+        (chess.KING, board.kings),
+    )
+    sliders = board.bishops | board.rooks | board.queens
+
+    while True:
+        side_attackers = attackers & occupied & board.occupied_co[side]
+        if not side_attackers:
+            break
+        for piece_type, piece_mask in piece_masks:
+            least_valuable = side_attackers & piece_mask
+            if least_valuable:
+                break
+        if piece_type == chess.KING and attackers & occupied & board.occupied_co[not side]:
+            # The king may not recapture onto a square that is still defended
+            break
+
+        gain.append(piece_on_square_value - gain[-1])
+        piece_on_square_value = SEE_PIECE_VALUES[piece_type]
+        occupied ^= least_valuable & -least_valuable
+        # Removing the attacker can reveal a slider behind it
+        attackers |= attackers_to(board, to_square, occupied) & sliders
+        side = not side
+
+    for depth in range(len(gain) - 1, 0, -1):
+        gain[depth - 1] = -max(-gain[depth - 1], gain[depth])
+    return gain[0]
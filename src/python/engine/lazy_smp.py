@@ -0,0 +1,197 @@
+#lazy_smp.py
+import atexit
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+
+import chess
+
+from utils.log import logger
+from utils.debug_config import get_debug_config
+from utils.config import get_threads, get_tt_size_mb, set_tt_size_mb, get_search_settings, set_search_settings
+from engine.transposition_table import TranspositionTable, table_size_bytes, get_transposition_table, set_transposition_table
+import engine.search as search
+
+
+debug_smp = get_debug_config("lazy_smp")
+
+# Helpers poll the stop event every few thousand nodes, so they return within milliseconds of the main search. One
+# that takes longer than this is taken to be stuck, and the pool is replaced rather than holding up the move
+HELPER_STOP_TIMEOUT = 2.0
+
+# Main process: the shared transposition table and the pool of helper processes searching on it
+shared_block = None
+shared_table = None
+executor = None
+executor_helpers = 0
+stop_event = None
+
+# Helper process: its attachment to the shared table
+helper_block = None
+
+
+def attach_shared_memory(name):
+    """
+    Attach to an existing shared memory block without taking ownership of it, so it outlives the helper process.
+    :param name: The name of the block
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before Python 3.13 attaching registers the block with the resource tracker. Helpers, forked or spawned, talk
+        # to the tracker of the main process, where the block is registered already, so the second registration is
+        # harmless. Dropping it again would remove the only one and make the unlink in shutdown_lazy_smp fail inside
+        # the tracker.
+        return shared_memory.SharedMemory(name=name)
+
+
+def init_helper(block_name, size_mb, event):
+    """
+    Initializer of every helper process: search on the shared transposition table and poll the stop event.
+    """
+    global helper_block
+    helper_block = attach_shared_memory(block_name)
+    set_tt_size_mb(size_mb)
+    set_transposition_table(TranspositionTable(size_mb, helper_block.buf))
+    search.set_stop_event(event)
+
+
+def helper_search(root_fen, moves, depth, depth_offset, generation, settings):
+    """
+    Search task run by a helper process: the same root as the main process, depth_offset plies deeper.
+    It has no time limit of its own, the main process stops it once its own search is done.
+    :param settings: The search settings of the main process, see get_search_settings in utils/config.py
+    :return: A tuple (completed_depth, best_move, eval, principal_variation) for the deepest completed iteration
+    """
+    set_search_settings(settings)
+    board = chess.Board(root_fen)
+    for move in moves:
+        board.push(move)
+    get_transposition_table().generation = generation
+    best_move, eval, principal_variation, completed_depth = search.iterative_deepening(board, depth, depth_offset=depth_offset)
+    return completed_depth, best_move, eval, principal_variation
+
+
+def start_helpers(helpers, size_mb):
+    """
+    Make sure the shared transposition table has the configured size and the pool has the requested number of helpers.
+    The main process searches on the shared table as well.
+    """
+    global shared_block, shared_table, executor, executor_helpers, stop_event
+    if shared_table is None or shared_table.size_mb != size_mb:
+        shutdown_lazy_smp()
+        shared_block = shared_memory.SharedMemory(create=True, size=table_size_bytes(size_mb))
+        shared_table = TranspositionTable(size_mb, shared_block.buf)
+        shared_table.clear()
+        if debug_smp:
+            logger.debug(f"Lazy SMP: shared transposition table of {size_mb} MB in {shared_block.name}")
+    set_transposition_table(shared_table)
+
+    if executor is None or executor_helpers != helpers:
+        if executor is not None:
+            stop_event.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+        # Never fork: the pool is started from a search thread while others, like the UCI stdin reader, may hold locks
+        # that a forked child would inherit locked, and its start-up then deadlocks
+        context = multiprocessing.get_context("spawn")
+        stop_event = context.Event()
+        executor = ProcessPoolExecutor(max_workers=helpers, mp_context=context, initializer=init_helper,
+                                       initargs=(shared_block.name, size_mb, stop_event))
+        executor_helpers = helpers
+        if debug_smp:
+            logger.debug(f"Lazy SMP: started {helpers} helper processes")
+
+
+def discard_helpers():
+    """
+    Kill the helper processes after some of them failed to stop, so the next search starts a fresh pool. The stop
+    event of the old pool stays set.
+    """
+    global executor, executor_helpers
+    # There is no public way to kill the workers of a ProcessPoolExecutor before Python 3.14
+    processes = list(executor._processes.values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+    executor = None
+    executor_helpers = 0
+
+
+def shutdown_lazy_smp():
+    """
+    Stop the helper processes and free the shared transposition table. The next search allocates a private table again.
+    Calling it again, e.g. from atexit after an explicit call, does nothing.
+    """
+    global shared_block, shared_table, executor, executor_helpers
+    if executor is not None:
+        stop_event.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+        executor = None
+        executor_helpers = 0
+    if shared_table is not None:
+        set_transposition_table(None)
+        shared_table.release()
+        shared_table = None
+        shared_block.close()
+        try:
+            shared_block.unlink()
+        except FileNotFoundError:
+            pass
+        shared_block = None
+
+
+atexit.register(shutdown_lazy_smp)
+
+
+def find_best_move_lazy_smp(board, depth, time_budget=None, return_pv=False):
+    """
+    Lazy SMP search: get_threads() - 1 helper processes search the same root as this process, every other one a ply
+    deeper, all sharing one lock-free transposition table. The helpers do not communicate otherwise; they speed up the
+    main search by filling the table with results it would have to compute itself. Once the main search is done the
+    helpers are stopped, and the result of the deepest completed iteration of any process is played.
+
+    Takes the same arguments and returns the same tuple as find_best_move.
+    """
+    if not board.legal_moves:
+        logger.info("No legal moves available.")
+        return (None, 0, []) if return_pv else (None, 0)
+
+    helpers = get_threads() - 1
+    start_helpers(helpers, get_tt_size_mb())
+    shared_table.new_search()
+    stop_event.clear()
+
+    root_fen = board.root().fen()
+    moves = list(board.move_stack)
+    settings = get_search_settings()
+    futures = [
+        executor.submit(helper_search, root_fen, moves, depth, helper_id % 2, shared_table.generation, settings)
+        for helper_id in range(1, helpers + 1)
+    ]
+
+    best_move, max_eval, principal_variation, completed_depth = search.iterative_deepening(board, depth, time_budget)
+    stop_event.set()
+
+    _, not_done = wait(futures, timeout=HELPER_STOP_TIMEOUT)
+    if not_done:
+        logger.warning(f"Lazy SMP: {len(not_done)} helpers did not stop, restarting the pool")
+        discard_helpers()
+
+    chosen_by = 0
+    for helper_id, future in enumerate(futures, 1):
+        if future in not_done:
+            continue
+        try:
+            helper_depth, helper_move, helper_eval, helper_pv = future.result()
+        except Exception:
+            logger.exception(f"Lazy SMP helper {helper_id} failed")
+            continue
+        if debug_smp:
+            logger.debug(f"Lazy SMP helper {helper_id}: depth {helper_depth}, {helper_move} ({helper_eval})")
+        if helper_move is not None and helper_depth > completed_depth:
+            best_move, max_eval, principal_variation, completed_depth = helper_move, helper_eval, helper_pv, helper_depth
+            chosen_by = helper_id
+
+    if debug_smp:
+        logger.debug(f"Lazy SMP: playing {best_move} from {'helper ' + str(chosen_by) if chosen_by else 'the main search'} at depth {completed_depth}")
+    return (best_move, max_eval, principal_variation) if return_pv else (best_move, max_eval)
@@ -0,0 +1,127 @@
+#move_ordering.py
+import chess
+
+from utils.log import logger
+from utils.debug_config import get_debug_config
+from utils.constants import PIECE_VALUES
+from engine.evaluation.see import static_exchange_evaluation
+
+
+debug_move_ordering = get_debug_config("move_ordering")
+
+# MVV_LVA_TABLE[victim][attacker]: most valuable victim first, least valuable attacker as tie-break
+MVV_LVA_TABLE = [
+    [0] * 7 if victim == 0 else [0] + [PIECE_VALUES[victim] * 10 - PIECE_VALUES[attacker] // 10 for attacker in chess.PIECE_TYPES]
+    for victim in range(7)
+]
+PROMOTION_BONUS = PIECE_VALUES[chess.QUEEN] * 10
+
+
+def score_capture(board, move):
+    """
+    Score a capture or promotion from the precomputed MVV-LVA table.
+    :param board: The chess board
+    :param move: A capture or promotion
+    :return: A tuple (score, is_good). Bad captures lose material by Static Exchange Evaluation and are searched last.
+    """
+    attacker = board.piece_type_at(move.from_square)
+    victim = board.piece_type_at(move.to_square)
+    if victim is None:
+        # En passant, or a promotion to an empty square
+        victim = chess.PAWN if attacker == chess.PAWN and (move.from_square & 7) != (move.to_square & 7) else 0
+    score = MVV_LVA_TABLE[victim][attacker]
+    if move.promotion:
+        if move.promotion != chess.QUEEN:
+            return score, False
+        score += PROMOTION_BONUS
+    elif PIECE_VALUES[victim] >= PIECE_VALUES[attacker]:
+        # Taking something at least as valuable can never lose material, no need for the exchange
+        return score, True
+    return score, static_exchange_evaluation(board, move) >= 0
+
+
+def pick_moves(board, tt_move=None, killers=(), history=None, quiescence=False, quiet_checks=True):
+    """
+    Yield the legal moves of the position lazily, one stage at a time:
+        1. the transposition table move
+        2. good captures and queen promotions (SEE >= 0), by MVV-LVA
+        3. killer moves
+        4. quiet moves, by history score
+        5. bad captures (SEE < 0) and underpromotions
+    A stage is only generated and scored once the previous stage failed to produce a cutoff, so most cut nodes
+    never pay for generating the quiet moves.
+
+    In quiescence mode the quiet stage is replaced by quiet moves that give check, quiet TT moves and killers are skipped,
+    and bad captures are not generated at all: a capture that loses material cannot raise the stand-pat score.
+
+    :param board: The chess board
+    :param tt_move: The best move stored in the transposition table for this position, if any
+    :param killers: Quiet moves that caused a cutoff at the same ply in sibling nodes
+    :param history: Butterfly history table indexed by from_square * 64 + to_square, or None
+    :param quiescence: Whether to generate the reduced move list of the quiescence search
+    :param quiet_checks: In quiescence mode, whether quiet checking moves are generated at all
+    """
+    turn = board.turn
+    them = board.occupied_co[not turn]
+
+    # Stage 1: the transposition table move
+    if tt_move and board.is_legal(tt_move):
+        if not quiescence or tt_move.promotion or board.is_capture(tt_move):
+            yield tt_move
+        else:
+            tt_move = None
+    else:
+        tt_move = None
+
+    # Stage 2: good captures and promotions
+    good_captures = []
+    bad_captures = []
+    for move in board.generate_legal_captures():
+        score, is_good = score_capture(board, move)
+        (good_captures if is_good else bad_captures).append((score, move))
+    promoting_pawns = board.pawns & board.occupied_co[turn] & (chess.BB_RANK_7 if turn == chess.WHITE else chess.BB_RANK_2)
+    if promoting_pawns:
+        for move in board.generate_legal_moves(promoting_pawns, ~board.occupied & chess.BB_ALL):
+            score, is_good = score_capture(board, move)
+            (good_captures if is_good else bad_captures).append((score, move))
+    good_captures.sort(key=lambda scored_move: scored_move[0], reverse=True)
+    for _, move in good_captures:
+        if move != tt_move:
+            yield move
+
+    if debug_move_ordering:
+        logger.debug(f"Move picker: {len(good_captures)} good captures, {len(bad_captures)} bad captures")
+
+    # Stage 3: killer moves
+    searched_killers = []
+    if not quiescence:
+        for killer in killers:
+            if (killer and killer != tt_move and not killer.promotion
+                    and not board.is_capture(killer) and board.is_legal(killer)):
+                searched_killers.append(killer)
+                yield killer
+
+    # Stage 4: quiet moves
+    if quiescence and not quiet_checks:
+        return
+    ep_square = board.ep_square
+    quiet_moves = []
+    for move in board.generate_legal_moves(chess.BB_ALL, ~them & chess.BB_ALL):
+        if move.promotion or move == tt_move or move in searched_killers:
+            continue
+        if ep_square is not None and move.to_square == ep_square and board.is_en_passant(move):
+            continue
+        if quiescence and not board.gives_check(move):
+            continue
+        quiet_moves.append(move)
+    if history is not None and len(quiet_moves) > 1:
+        quiet_moves.sort(key=lambda move: history[move.from_square * 64 + move.to_square], reverse=True)
+    yield from quiet_moves
+
+    # Stage 5: bad captures and underpromotions
+    if quiescence:
+        return
+    bad_captures.sort(key=lambda scored_move: scored_move[0], reverse=True)
+    for _, move in bad_captures:
+        if move != tt_move:
+            yield move
@@ -0,0 +1,201 @@
+#root_split.py
+import atexit
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait
+
+import chess
+
+from utils.log import logger
+from utils.debug_config import get_debug_config
+from utils.config import get_threads, get_tt_size_mb, set_tt_size_mb, get_search_settings, set_search_settings
+from utils.counters import get_total_counters, reset_total_counters, add_total_counters
+from engine.transposition_table import get_transposition_table
+import engine.search as search
+
+
+debug_smp = get_debug_config("lazy_smp")
+
+# The move searched first, whose score is the bound for all others, comes from a search of all moves this many plies
+# shallower
+FIRST_MOVE_DEPTH_REDUCTION = 2
+# Seconds between two checks of the stop event of the calling thread while waiting for the workers
+STOP_POLL_INTERVAL = 0.01
+
+# The pool of worker processes, the (workers, size_mb) it was started with, and the event that stops their tasks
+executor = None
+executor_config = None
+stop_event = None
+
+
+def init_worker(size_mb, event):
+    """
+    Initializer of every worker process: use a private transposition table of the configured size, and keep the stop
+    event for the tasks to poll.
+    """
+    global stop_event
+    set_tt_size_mb(size_mb)
+    stop_event = event
+
+
+def start_task(root_fen, moves, settings):
+    """
+    Set up a worker process for a task, with the search settings of the main process (see get_search_settings in
+    utils/config.py) and a clean transposition table and clean killer and history tables, so the result does not
+    depend on which tasks the worker ran before.
+    :return: The board to search
+    """
+    set_search_settings(settings)
+    board = chess.Board(root_fen)
+    for move in moves:
+        board.push(move)
+    search.reset_search_state()
+    search.set_stop_event(stop_event)
+    reset_total_counters()
+    table = get_transposition_table()
+    table.clear()
+    table.new_search()
+    return board
+
+
+def find_first_move(root_fen, moves, depth, settings):
+    """
+    Search task run by a worker process: all root moves, to pick the one to search first.
+    :return: A tuple (best_move, counters)
+    """
+    board = start_task(root_fen, moves, settings)
+    best_move, _, _, _ = search.iterative_deepening(board, depth)
+    return best_move, get_total_counters()
+
+
+def search_root_move(root_fen, moves, root_move, depth, settings, alpha=-float('inf'), beta=float('inf')):
+    """
+    Search task run by a worker process: the subtree of a single root move.
+    :param alpha: The window at the root, see iterative_deepening in engine/search.py
+    :param beta: The window at the root
+    :return: A tuple (eval, principal_variation, completed_depth, counters)
+    """
+    board = start_task(root_fen, moves, settings)
+    _, eval, principal_variation, completed_depth = search.iterative_deepening(board, depth, root_moves=[root_move],
+                                                                               root_alpha=alpha, root_beta=beta)
+    return eval, principal_variation, completed_depth, get_total_counters()
+
+
+def start_workers(workers, size_mb):
+    """
+    Make sure the pool has the requested number of workers with tables of the configured size.
+    """
+    global executor, executor_config, stop_event
+    if executor is None or executor_config != (workers, size_mb):
+        shutdown_root_split()
+        # Spawned rather than forked, for the same reason as the Lazy SMP helpers (see start_helpers in engine/lazy_smp.py)
+        context = multiprocessing.get_context("spawn")
+        stop_event = context.Event()
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                       initializer=init_worker, initargs=(size_mb, stop_event))
+        executor_config = (workers, size_mb)
+        if debug_smp:
+            logger.debug(f"Root split: started {workers} worker processes")
+
+
+def shutdown_root_split():
+    """
+    Stop the worker processes.
+    """
+    global executor, executor_config
+    if executor is not None:
+        stop_event.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+        executor = None
+        executor_config = None
+
+
+atexit.register(shutdown_root_split)
+
+
+def wait_for_tasks(futures):
+    """
+    Wait until all tasks are done, passing a stop of the calling thread's search on to the workers.
+    :return: Whether the search was stopped, in which case the results may come from partial searches
+    """
+    pending = futures
+    while pending:
+        _, pending = wait(pending, timeout=STOP_POLL_INTERVAL)
+        if pending and search.stop_requested():
+            stop_event.set()
+    return stop_event.is_set()
+
+
+def find_best_move_root_split(board, depth, time_budget=None, return_pv=False):
+    """
+    Root splitting over get_threads() worker processes, principal variation search style: the best move of a search
+    FIRST_MOVE_DEPTH_REDUCTION plies shallower is searched on its own with a full window, then all other moves in
+    parallel with a zero window around its score, and the moves that beat it are searched again with a full window.
+    The best score wins, ties going to the move ordered first. Every task starts from freshly cleared tables and its
+    window only depends on the score of the first move, so at a fixed depth the result is exactly reproducible,
+    whatever the number of workers and the order in which they finish.
+
+    This is meant for analysis and test suites, so there is no time budget: find_best_move hands timed searches to
+    another backend. The stop event of the calling thread (see set_stop_event in engine/search.py) still stops the
+    workers; the moves searched to the end by then decide, and the first move if there are none.
+
+    Takes the same arguments and returns the same tuple as find_best_move.
+    """
+    if time_budget is not None:
+        raise ValueError("Root splitting searches to a fixed depth and takes no time budget")
+    if not board.legal_moves:
+        logger.info("No legal moves available.")
+        return (None, 0, []) if return_pv else (None, 0)
+
+    start_workers(get_threads(), get_tt_size_mb())
+    stop_event.clear()
+    root_fen = board.root().fen()
+    moves = list(board.move_stack)
+    root_moves = search.order_moves(board)
+    settings = get_search_settings()
+
+    def search_moves(root_moves, alpha=-float('inf'), beta=float('inf')):
+        """
+        Search the moves in parallel.
+        :return: A tuple (results, stopped), where results maps every move searched to an (eval, principal_variation)
+        """
+        futures = [executor.submit(search_root_move, root_fen, moves, move, depth, settings, alpha, beta)
+                   for move in root_moves]
+        stopped = wait_for_tasks(futures)
+        results = {}
+        for move, future in zip(root_moves, futures):
+            eval, move_pv, completed_depth, (positions_evaluated, lines_pruned) = future.result()
+            add_total_counters(positions_evaluated, lines_pruned)
+            if debug_smp:
+                logger.debug(f"Root split: {move} searched to depth {completed_depth} in ({alpha}, {beta}): {eval}")
+            if completed_depth:
+                results[move] = (eval, move_pv)
+        return results, stopped
+
+    future = executor.submit(find_first_move, root_fen, moves, max(1, depth - FIRST_MOVE_DEPTH_REDUCTION), settings)
+    stopped = wait_for_tasks([future])
+    first_move, (positions_evaluated, lines_pruned) = future.result()
+    add_total_counters(positions_evaluated, lines_pruned)
+    if first_move is None:
+        first_move = root_moves[0]
+    best_move, max_eval, principal_variation = first_move, 0, [first_move]
+    if not stopped:
+        results, stopped = search_moves([first_move])
+        if first_move in results:
+            max_eval, principal_variation = results[first_move]
+    if not stopped:
+        # The other moves only have to show whether they beat the first one. Results of a stopped round are not
+        # comparable, the moves were searched to different depths
+        other_moves = [move for move in root_moves if move != first_move]
+        probes, stopped = search_moves(other_moves, max_eval, max_eval + 1)
+        better_moves = [move for move in other_moves if move in probes and probes[move][0] > max_eval]
+        if better_moves and not stopped:
+            results, stopped = search_moves(better_moves)
+        if better_moves and not stopped:
+            for move in better_moves:
+                if move in results and results[move][0] > max_eval:
+                    best_move = move
+                    max_eval, principal_variation = results[move]
+
+    if debug_smp:
+        logger.debug(f"Root split: playing {best_move} ({max_eval}){', stopped' if stopped else ''}")
+    return (best_move, max_eval, principal_variation) if return_pv else (best_move, max_eval)
@@ -1,15 +1,30 @@
 
 #search.py
+import math
+import threading
 import time
 import chess
 
-from engine.evaluation.evaluation import evaluate_position, MVV_LVA, add_check_bonus, CHECKMATE_BASE_SCORE, set_last_logged_phase
+from engine.evaluation.evaluation import evaluate_position, CHECKMATE_BASE_SCORE
 from ui.terminal_prints import print_board_clean
 from utils.counters import update_total_counters
 from utils.log import logger
 from utils.debug_config import debug_config, get_debug_config
-from utils.config import get_global_depth, set_global_depth, get_iterative_deepening, get_iterative_depth, set_iterative_depth, get_qDepth, set_qDepth_restricted, set_qDepth_removed
-from utils.game_phase import calculate_game_phase, get_last_logged_phase
+from utils.config import get_global_depth, set_global_depth, get_iterative_deepening, get_iterative_depth, set_iterative_depth, get_qDepth, set_qDepth_restricted, set_qDepth_removed, get_qsearch_check_plies, get_delta_margin
+from utils.config import (get_null_move_pruning, get_null_move_reduction, get_null_move_verification_material,
+                          get_late_move_reductions, get_lmr_min_depth, get_lmr_min_moves, get_lmr_base, get_lmr_divisor,
+                          get_late_move_pruning, get_lmp_max_depth, get_aspiration_window,
+                          get_futility_pruning, get_futility_margin, get_reverse_futility_pruning, get_reverse_futility_margin,
+                          get_razoring, get_razoring_margin, get_max_extensions, get_check_extensions,
+                          get_recapture_extensions, get_singular_extensions, get_singular_margin, get_threads,
+                          get_search_backend)
+from utils.constants import MAX_SEARCH_PLY, PIECE_VALUES
+from engine.board import SearchBoard
+from engine.move_ordering import pick_moves
+from engine.time_manager import as_time_manager
+from engine.evaluation.pawn_structure import get_pawn_hash_table
+from engine.evaluation.eval_cache import get_eval_cache
+from engine.transposition_table import get_transposition_table, score_to_tt, score_from_tt, BOUND_EXACT, BOUND_LOWER, BOUND_UPPER
 
 
 GLOBAL_DEPTH = get_global_depth()
@@ -23,52 +38,276 @@ except ValueError:
 debug_search = get_debug_config("search")
 debug_move_ordering = get_debug_config("move_ordering")
 debug_play = get_debug_config("play")
+debug_tt = get_debug_config("transposition_table")
 
+transposition_table = get_transposition_table()
 
+HISTORY_MAX = 1 << 20
+# Nodes between two polls of the stop event. Polling a multiprocessing event takes a lock, far more than a node's bookkeeping
+STOP_POLL_NODES = 1024
+# Seconds between two progress reports to the info handler within a long iteration
+INFO_INTERVAL = 1.0
 
-def order_moves(board, quiescence=False):
-    all_moves = list(board.legal_moves)
-    check_bonus = 100
-    # Sort moves by their type
-    checkmates = []
-    promotions = []
-    captures = []
-    checks = []
-    non_captures = []
-    for move in all_moves:
-        # board.push(move)
-        # if board.is_checkmate():
-        #     checkmates.append(move)
-        # board.pop()
-        if move.promotion:
-            promotions.append(move)
-        elif board.gives_check(move):
-            board.push(move)
-            if board.is_checkmate():
-                checkmates.append(move)
-                board.pop()
-                return checkmates
-            else: checks.append(move)
-            board.pop()
-        elif board.is_capture(move):
-            captures.append(move)
-        else:
-            non_captures.append(move)
-        
-    if debug_move_ordering and checkmates: 
-        logger.debug(f"Found {len(checkmates)} checkmate move(s): {checkmates}")
 
-    if debug_move_ordering:
-        logger.debug(f"Ordering moves: {len(promotions)} promotions, {len(captures)} captures, {len(checks)} checks, {len(non_captures)} non-captures")
-        logger.debug(f"Promotions: {len(promotions)}, Captures: {len(captures)}, Checks: {len(checks)}, Non-captures: {len(non_captures)}")
-        logger.debug(f"All captures: {captures}")
+class SearchState(threading.local):
+    """
+    The tables a search updates as it goes. Every thread gets its own instance, so several searches can run
+    in parallel threads of one process (see engine/threaded_search.py) and only share the transposition table.
+    """
+
+    def __init__(self):
+        # Two killer slots per ply: quiet moves that caused a beta cutoff at that ply in a sibling subtree
+        self.killer_moves = [[None, None] for _ in range(MAX_SEARCH_PLY + 1)]
+        # Butterfly history table, indexed by from_square * 64 + to_square
+        self.history_table = [0] * 4096
+        # Triangular principal variation table: pv_table[ply][ply:pv_length[ply]] is the best line found from the node at that ply
+        self.pv_table = [[None] * (MAX_SEARCH_PLY + 2) for _ in range(MAX_SEARCH_PLY + 2)]
+        self.pv_length = [0] * (MAX_SEARCH_PLY + 2)
+        # The PV of the previous iteration, indexed by ply, and whether the current node still lies on it
+        self.previous_pv = []
+        self.following_pv = False
+        # Event that tells this search to give up, e.g. on a UCI stop or when the main Lazy SMP search is done.
+        # It is only polled every STOP_POLL_NODES nodes, stopped caches the answer for the checks in between
+        self.stop_event = None
+        self.stopped = False
+        self.next_stop_poll = STOP_POLL_NODES
+        # The TimeManager of a timed search, whose hard limit is checked together with the stop event
+        self.time_manager = None
+        # Progress of the current search: nodes (negamax and quiescence), the deepest ply reached and the iteration
+        self.nodes = 0
+        self.seldepth = 0
+        self.current_depth = 0
+        self.search_start = 0.0
+        # Called with the progress after every completed iteration and every INFO_INTERVAL seconds, e.g. to send UCI info lines
+        self.info_handler = None
+        self.last_info_time = 0.0
+
+
+state = SearchState()
+
+
+def reset_search_state():
+    """
+    Forget the killer, history and PV tables of earlier searches in the calling thread, so the next search does not
+    depend on what was searched before.
+    """
+    state.__init__()
+
+
+def set_stop_event(event):
+    """
+    Install the event polled by the search of the calling thread to stop early. Results of nodes that were stopped are neither stored nor used.
+    """
+    state.stop_event = event
+
+
+def stop_requested():
+    """
+    Whether the stop event of the calling thread is set, for a caller that waits on searches in other processes.
+    """
+    return state.stop_event is not None and state.stop_event.is_set()
+
+
+def set_info_handler(handler):
+    """
+    Install the function the search of the calling thread reports its progress to, or None. It is called with the keyword
+    arguments depth, seldepth, nodes, time (seconds), hashfull (per mille) and, after a completed iteration, score and pv.
+    """
+    state.info_handler = handler
+
+
+def send_info(score=None, principal_variation=None):
+    """
+    Report the progress of the search to the info handler, if there is one.
+    """
+    now = time.perf_counter()
+    state.last_info_time = now
+    state.info_handler(depth=state.current_depth, seldepth=state.seldepth, nodes=state.nodes, time=now - state.search_start,
+                       hashfull=transposition_table.hashfull(), score=score, pv=principal_variation)
+
+
+def poll_stop():
+    """
+    Check the stop event now and schedule the next poll. Long iterations also report their progress from here.
+    :return: Whether the search has to stop
+    """
+    state.next_stop_poll = state.nodes + STOP_POLL_NODES
+    if state.stop_event is not None and state.stop_event.is_set():
+        state.stopped = True
+    elif state.time_manager is not None and state.time_manager.hard_limit_reached():
+        state.stopped = True
+    if state.info_handler is not None and time.perf_counter() - state.last_info_time >= INFO_INTERVAL:
+        send_info()
+    return state.stopped
+
+
+def end_search():
+    """
+    Leave nothing behind that would stop a later search, or a direct call of negamax_alpha_beta, in the calling thread.
+    """
+    state.stopped = False
+    state.time_manager = None
+
+NULL_MOVE_MIN_DEPTH = 3
+IID_MIN_DEPTH = 4
+# Frontier pruning only applies this close to the horizon
+FUTILITY_MAX_DEPTH = 3
+REVERSE_FUTILITY_MAX_DEPTH = 3
+RAZORING_MAX_DEPTH = 2
+SINGULAR_MIN_DEPTH = 6
+# Aspiration windows wider than this are replaced by an open bound
+ASPIRATION_MAX_WINDOW = PIECE_VALUES[chess.QUEEN]
+# Pruning and reduction settings, read from utils/config by load_search_parameters() at the start of every search
+null_move_pruning = True
+null_move_reduction = 2
+null_move_verification_material = 500
+late_move_reductions = True
+lmr_min_depth = 3
+lmr_min_moves = 3
+late_move_pruning = True
+lmp_max_depth = 3
+futility_pruning = True
+futility_margin = 150
+reverse_futility_pruning = True
+reverse_futility_margin = 120
+razoring = True
+razoring_margin = 300
+max_extensions = 4
+check_extensions = True
+recapture_extensions = True
+singular_extensions = True
+singular_margin = 2
+# LMR_TABLE[depth][move_number]: logarithmic late move reduction in plies
+LMR_TABLE = [[0] * 64 for _ in range(64)]
+
+
+def load_search_parameters():
+    """
+    Copy the pruning and reduction settings from utils/config into this module, and rebuild the late move reduction table.
+    Done once per search, so the search itself does not call the config getters at every node.
+    """
+    global null_move_pruning, null_move_reduction, null_move_verification_material
+    global late_move_reductions, lmr_min_depth, lmr_min_moves, late_move_pruning, lmp_max_depth
+    global futility_pruning, futility_margin, reverse_futility_pruning, reverse_futility_margin, razoring, razoring_margin
+    global max_extensions, check_extensions, recapture_extensions, singular_extensions, singular_margin, qDepth
+    null_move_pruning = get_null_move_pruning()
+    null_move_reduction = get_null_move_reduction()
+    null_move_verification_material = get_null_move_verification_material()
+    late_move_reductions = get_late_move_reductions()
+    lmr_min_depth = get_lmr_min_depth()
+    # The first move is always searched at full depth, it sets alpha for the zero-window searches
+    lmr_min_moves = max(get_lmr_min_moves(), 1)
+    late_move_pruning = get_late_move_pruning()
+    lmp_max_depth = get_lmp_max_depth()
+    futility_pruning = get_futility_pruning()
+    futility_margin = get_futility_margin()
+    reverse_futility_pruning = get_reverse_futility_pruning()
+    reverse_futility_margin = get_reverse_futility_margin()
+    razoring = get_razoring()
+    razoring_margin = get_razoring_margin()
+    max_extensions = get_max_extensions()
+    check_extensions = get_check_extensions()
+    recapture_extensions = get_recapture_extensions()
+    singular_extensions = get_singular_extensions()
+    singular_margin = get_singular_margin()
+    qDepth = get_qDepth()
+
+    lmr_base = get_lmr_base()
+    lmr_divisor = get_lmr_divisor()
+    for depth in range(1, 64):
+        for move_number in range(1, 64):
+            LMR_TABLE[depth][move_number] = max(0, int(lmr_base + math.log(depth) * math.log(move_number) / lmr_divisor))
+
+
+def non_pawn_material(board, color):
+    """
+    Material of the knights, bishops, rooks and queens of one side, used to recognise zugzwang-prone positions.
+    """
+    pieces = board.occupied_co[color]
+    return (chess.popcount(board.knights & pieces) * PIECE_VALUES[chess.KNIGHT]
+            + chess.popcount(board.bishops & pieces) * PIECE_VALUES[chess.BISHOP]
+            + chess.popcount(board.rooks & pieces) * PIECE_VALUES[chess.ROOK]
+            + chess.popcount(board.queens & pieces) * PIECE_VALUES[chess.QUEEN])
+
+
+load_search_parameters()
+
+
+def clear_killer_moves():
+    """
+    Empty the killer slots, done before every search since plies are counted from the new root.
+    """
+    for killers in state.killer_moves:
+        killers[0] = killers[1] = None
+
+
+def age_history_table():
+    """
+    Halve every history score between searches, so old cutoffs still help ordering but recent ones dominate.
+    """
+    history_table = state.history_table
+    for index in range(4096):
+        history_table[index] >>= 1
+
+
+def update_quiet_move_tables(move, depth, ply):
+    """
+    Record a quiet move that caused a beta cutoff in the killer slots of its ply and in the history table.
+    """
+    killers = state.killer_moves[ply]
+    if killers[0] != move:
+        killers[1] = killers[0]
+        killers[0] = move
+
+    history_table = state.history_table
+    index = move.from_square * 64 + move.to_square
+    history_table[index] += depth * depth
+    if history_table[index] > HISTORY_MAX:
+        age_history_table()
+
+
+def update_pv(ply, move):
+    """
+    Make a move the start of the principal variation at its ply, followed by the line of the child node.
+    """
+    pv_table = state.pv_table
+    pv_length = state.pv_length
+    row = pv_table[ply]
+    row[ply] = move
+    child_length = pv_length[ply + 1]
+    row[ply + 1:child_length] = pv_table[ply + 1][ply + 1:child_length]
+    pv_length[ply] = max(child_length, ply + 1)
+
+
+def mated_score(ply):
+    """
+    Score for the side to move being checkmated at the given ply. Mates closer to the root score lower.
+    """
+    return -(CHECKMATE_BASE_SCORE + MAX_SEARCH_PLY - ply)
+
 
-    #Sort captures by MVV - LVA
-    captures.sort(key=lambda x: MVV_LVA(board, x) + add_check_bonus(board,x,check_bonus), reverse=True)
-    
-    if quiescence:
-        return checkmates + promotions + captures + checks 
-    return checkmates + promotions + captures + checks + non_captures
+
+def is_draw(board, in_check):
+    """
+    Detect the draws that can be seen without generating moves: insufficient material, repetition and the fifty-move rule.
+    Checkmate and stalemate are left to the move loop, which finds out for free whether there is a legal move.
+    :param board: The SearchBoard to check
+    :param in_check: Whether the side to move is in check, computed once per node by the caller
+    :return: True if the position is a draw
+    """
+    if board.is_insufficient_material() or board.is_repetition_draw():
+        return True
+    if board.is_fifty_moves_draw():
+        # Being checkmated on the hundredth half-move still loses
+        return not in_check or any(board.generate_legal_moves())
+    return False
+
+
+def order_moves(board, quiescence=False, tt_move=None):
+    """
+    Full ordered move list, for the root where every move is searched anyway. Interior nodes use the lazy pick_moves directly.
+    """
+    return list(pick_moves(board, tt_move=tt_move, quiescence=quiescence))
 
         
 def is_quiet(board):
@@ -79,8 +318,7 @@ def is_quiet(board):
     return True
 
 
-def quiescence_search(board, qDepth, alpha, beta):
-    
+def quiescence_search(board, qDepth, alpha, beta, ply=0, qPly=0):
     """
     Perform a quiescence search on the given board.
 
@@ -88,43 +326,94 @@ def quiescence_search(board, qDepth, alpha, beta):
     This search is used to extend the search tree beyond the horizon of the main search, by searching all possible captures until there are no more captures left.
     This helps to reduce the horizon effect, which is the problem of not seeing the consequences of a move far enough into the future.
 
-    :param board: The board to search
+    The static evaluation (stand pat) is taken before any move is generated, so a node that already fails high costs one evaluation.
+    Captures that cannot raise alpha even when the captured piece is won for free plus the delta margin are skipped (delta pruning),
+    and quiet checks are only searched in the first get_qsearch_check_plies() plies of the quiescence search.
+
+    :param board: The board to search, a SearchBoard
     :param alpha: The alpha value for alpha-beta pruning
     :param beta: The beta value for alpha-beta pruning
+    :param ply: The distance from the root, used for mate scores and the transposition table
+    :param qPly: The number of quiescence plies already searched above this node
     :return: The best evaluation score of all possible moves
     """
-    max_eval = evaluate_position(board)
-
-    if board.outcome() or qDepth == 0:
-        if max_eval == CHECKMATE_BASE_SCORE:
-            return CHECKMATE_BASE_SCORE + qDepth
-        elif max_eval == -CHECKMATE_BASE_SCORE:
-            return -CHECKMATE_BASE_SCORE - qDepth
-        return max_eval
-    elif (board.can_claim_threefold_repetition() or board.can_claim_fifty_moves()):
+    state.nodes += 1
+    if state.nodes >= state.next_stop_poll:
+        poll_stop()
+    if ply > state.seldepth:
+        state.seldepth = ply
+    in_check = board.is_check()
+    if is_draw(board, in_check):
         return 0
+    if qDepth == 0:
+        return evaluate_position(board, check_outcome=False)
+
+    key = board.zobrist_key
+    tt_move = None
+    tt_entry = transposition_table.probe(key)
+    if tt_entry:
+        _, tt_bound, tt_score, tt_move = tt_entry
+        tt_score = score_from_tt(tt_score, ply)
+        if (tt_bound == BOUND_EXACT
+                or (tt_bound == BOUND_LOWER and tt_score >= beta)
+                or (tt_bound == BOUND_UPPER and tt_score <= alpha)):
+            return tt_score
+
+    # Quiet evasions are not searched here, so ask the move generator whether the side in check has any move at all
+    if in_check and not any(board.generate_legal_moves()):
+        return mated_score(ply)
+
+    max_eval = evaluate_position(board, check_outcome=False)
     if max_eval >= beta:
+        transposition_table.store(key, 0, BOUND_LOWER, score_to_tt(max_eval, ply), None)
         return beta
+    alpha_orig = alpha
     if max_eval > alpha:
         alpha = max_eval
 
+    # Delta pruning: captures only matter if winning the captured piece can lift the stand pat above alpha
+    delta_pruning = not in_check
+    delta_base = max_eval + get_delta_margin()
+    if delta_pruning and delta_base + PIECE_VALUES[chess.QUEEN] <= alpha:
+        promoting_pawns = board.pawns & board.occupied_co[board.turn] & (chess.BB_RANK_7 if board.turn == chess.WHITE else chess.BB_RANK_2)
+        if not promoting_pawns:
+            # Not even winning a queen would help
+            return max_eval
+
+    best_move = None
     local_positions_evaluated = 0
     local_lines_pruned = 0
-    for move in order_moves(board, quiescence=True):
+    quiet_checks = qPly < get_qsearch_check_plies()
+    for move in pick_moves(board, tt_move=tt_move, quiescence=True, quiet_checks=quiet_checks):
+        if delta_pruning and not move.promotion:
+            victim = board.piece_type_at(move.to_square)
+            if victim and delta_base + PIECE_VALUES[victim] <= alpha:
+                continue
         local_positions_evaluated += 1
-        board.push(move)
-        eval = -quiescence_search(board, qDepth - 1 , -beta, -alpha)
-        board.pop()
+        board.make_move(move)
+        eval = -quiescence_search(board, qDepth - 1 , -beta, -alpha, ply + 1, qPly + 1)
+        board.unmake_move()
         if eval >= CHECKMATE_BASE_SCORE:
-                return eval
+            max_eval = eval
+            best_move = move
+            break
         
         if eval > max_eval:
             max_eval = eval
+            best_move = move
         alpha = max(alpha, eval)
         if alpha >= beta:
             local_lines_pruned += 1
             break 
 
+    if max_eval >= beta or max_eval >= CHECKMATE_BASE_SCORE:
+        bound = BOUND_LOWER
+    elif max_eval <= alpha_orig:
+        bound = BOUND_UPPER
+    else:
+        bound = BOUND_EXACT
+    transposition_table.store(key, 0, bound, score_to_tt(max_eval, ply), best_move)
+
     update_total_counters(local_positions_evaluated, local_lines_pruned, reset_ply=False)
     return max_eval
         
@@ -132,37 +421,154 @@ def quiescence_search(board, qDepth, alpha, beta):
 
 
 
-def negamax_alpha_beta(board, depth, alpha= -float('inf'), beta = float('inf'), remaining_time = None):
+def negamax_alpha_beta(board, depth, alpha= -float('inf'), beta = float('inf'), ply = 1, allow_null = True,
+                       extensions = 0, last_capture_square = None, excluded_move = None):
     """
     New Negamax alpha beta search function, using the python chess board object. This function is the old negamax function, 
     but changed to work with my new chess bot. It uses the python chess board object and the evaluate_position function.
-    :param board: The chess board, currently uses the python chess board object
+
+    Selectivity, all switchable in utils/config:
+        - null move pruning: if passing the move still fails high at reduced depth, the node is cut. Cutoffs are
+          verified by a reduced normal search when the side to move has little material left (zugzwang), and the
+          null move is never tried with only pawns left or while in check.
+        - principal variation search: every move after the first is searched with a zero window around alpha
+          first, and re-searched with the full window only if it beats alpha.
+        - late move reductions: quiet moves late in the ordering are searched at a logarithmically reduced depth
+          and re-searched at full depth if they beat alpha.
+        - late move pruning: close to the horizon at non-PV nodes, quiet moves after the first 3 + depth^2 are not
+          searched at all, unless they give check.
+        - frontier pruning at non-PV nodes close to the horizon, based on the static evaluation: reverse futility
+          pruning fails high when the static eval beats beta by a margin, razoring drops to the quiescence search when
+          it is far below alpha, and futility pruning skips quiet moves that cannot bring it up to alpha.
+          None of these apply in check or when alpha or beta are mate scores.
+        - extensions, one ply each and at most max_extensions along a path: moves that give check, recaptures on
+          the square of the previous capture at PV nodes, and a TT move that is singular, i.e. every other move fails
+          low against a bound a little below its TT score in a reduced search that excludes it.
+
+    The best line is collected in the triangular pv_table. While the search walks down the PV of the previous iteration,
+    the PV move of each ply is searched first; PV nodes without any move to start from run a shallower search first
+    (internal iterative deepening) to find one.
+
+    :param board: The chess board, a SearchBoard so the Zobrist key is maintained incrementally
     :param depth: The depth to search
     :param alpha: The alpha value for alpha beta pruning
     :param beta: The beta value for alpha beta pruning
+    :param ply: The distance from the root, used for mate scores and the transposition table
+    :param allow_null: Whether a null move may be tried at this node, False right after a null move and in verification searches
+    :param extensions: The number of extension plies already used on the path from the root
+    :param last_capture_square: The target square of the previous move if it was a capture, for recapture extensions
+    :param excluded_move: A move to leave out, for the singular extension search. Such searches do not use the transposition table.
     :return: The evaluation score of the best move
     """
-
-    
-    if board.outcome():
-        eval = evaluate_position(board) 
-        if eval == CHECKMATE_BASE_SCORE:
-            return CHECKMATE_BASE_SCORE + qDepth + depth
-        elif eval == -CHECKMATE_BASE_SCORE:
-            return -CHECKMATE_BASE_SCORE - qDepth - depth
-        return 0
-    
-    elif (board.can_claim_threefold_repetition() or board.can_claim_fifty_moves()):
+    state.pv_length[ply] = ply
+    state.nodes += 1
+    if state.nodes >= state.next_stop_poll:
+        poll_stop()
+    if ply > state.seldepth:
+        state.seldepth = ply
+    in_check = board.is_check()
+    if is_draw(board, in_check):
         return 0
     
     elif depth == 0:
-        return quiescence_search(board, qDepth, alpha, beta)
-    
-    ordered_moves = order_moves(board)
+        return quiescence_search(board, qDepth, alpha, beta, ply)
+
+    key = board.zobrist_key
+    tt_move = None
+    tt_entry = transposition_table.probe(key) if excluded_move is None else None
+    if tt_entry:
+        tt_depth, tt_bound, tt_score, tt_move = tt_entry
+        tt_score = score_from_tt(tt_score, ply)
+        if tt_depth >= depth:
+            if (tt_bound == BOUND_EXACT
+                    or (tt_bound == BOUND_LOWER and tt_score >= beta)
+                    or (tt_bound == BOUND_UPPER and tt_score <= alpha)):
+                if tt_bound == BOUND_EXACT and tt_move:
+                    # Keep the stored move as the line from here, so the principal variation does not end at the cutoff
+                    state.pv_table[ply][ply] = tt_move
+                    state.pv_length[ply] = ply + 1
+                return tt_score
+
+    pv_node = beta - alpha > 1
+    pv_move = None
+    if state.following_pv:
+        previous_pv = state.previous_pv
+        if ply < len(previous_pv) and board.is_legal(previous_pv[ply]):
+            pv_move = previous_pv[ply]
+        else:
+            state.following_pv = False
+
+    # Frontier pruning, from the static evaluation
+    futile = False
+    if (not pv_node and not in_check and depth <= FUTILITY_MAX_DEPTH
+            and -CHECKMATE_BASE_SCORE < alpha and beta < CHECKMATE_BASE_SCORE):
+        static_eval = evaluate_position(board, check_outcome=False)
+        if (reverse_futility_pruning and depth <= REVERSE_FUTILITY_MAX_DEPTH
+                and static_eval - reverse_futility_margin * depth >= beta):
+            return static_eval - reverse_futility_margin * depth
+        if razoring and depth <= RAZORING_MAX_DEPTH and static_eval + razoring_margin * depth <= alpha:
+            razor_eval = quiescence_search(board, qDepth, alpha, beta, ply)
+            if razor_eval <= alpha:
+                return razor_eval
+        futile = futility_pruning and static_eval + futility_margin * depth <= alpha
+
+    # Null move pruning
+    if (null_move_pruning and allow_null and excluded_move is None and not pv_node and not in_check and depth >= NULL_MOVE_MIN_DEPTH
+            and beta < CHECKMATE_BASE_SCORE):
+        material = non_pawn_material(board, board.turn)
+        if material:
+            reduction = null_move_reduction + depth // 6
+            board.make_move(chess.Move.null())
+            null_eval = -negamax_alpha_beta(board, max(depth - 1 - reduction, 0), -beta, -beta + 1, ply=ply + 1, allow_null=False,
+                                            extensions=extensions)
+            board.unmake_move()
+            if null_eval >= beta:
+                if null_eval >= CHECKMATE_BASE_SCORE:
+                    # A mate found by passing is not a proven mate
+                    null_eval = beta
+                if material > null_move_verification_material:
+                    return null_eval
+                verified_eval = negamax_alpha_beta(board, max(depth - 1 - reduction, 1), beta - 1, beta, ply=ply, allow_null=False,
+                                                  extensions=extensions)
+                if verified_eval >= beta:
+                    return null_eval
+
+    # Internal iterative deepening: a PV node without a move to try first gets one from a shallower search
+    if pv_node and pv_move is None and tt_move is None and depth >= IID_MIN_DEPTH and excluded_move is None:
+        negamax_alpha_beta(board, depth - 2, alpha, beta, ply, extensions=extensions, last_capture_square=last_capture_square)
+        tt_entry = transposition_table.probe(key)
+        if tt_entry:
+            # The singular extension below reads the whole entry, not just the move
+            tt_depth, tt_bound, tt_score, tt_move = tt_entry
+            tt_score = score_from_tt(tt_score, ply)
+
+    # Singular extension: is the TT move the only good move here?
+    singular_move = None
+    can_extend = extensions < max_extensions
+    if (singular_extensions and can_extend and tt_entry and tt_move and depth >= SINGULAR_MIN_DEPTH
+            and tt_depth >= depth - 3 and tt_bound != BOUND_UPPER and abs(tt_score) < CHECKMATE_BASE_SCORE):
+        singular_beta = tt_score - singular_margin * depth
+        # The search without the TT move leaves the PV at its first move, the real search of this node still follows it
+        following_pv = state.following_pv
+        singular_eval = negamax_alpha_beta(board, (depth - 1) // 2, singular_beta - 1, singular_beta, ply,
+                                           allow_null=False, extensions=extensions, last_capture_square=last_capture_square,
+                                           excluded_move=tt_move)
+        state.following_pv = following_pv
+        state.pv_length[ply] = ply
+        if singular_eval < singular_beta:
+            singular_move = tt_move
+
+    killers = state.killer_moves[ply]
+    ordered_moves = pick_moves(board, tt_move=pv_move or tt_move, killers=killers, history=state.history_table)
+    alpha_orig = alpha
     max_eval = -float('inf')
+    best_move = None
+    timed_out = False
     local_positions_evaluated = 0
     local_lines_pruned = 0
-   
+    moves_pruned = False
+    can_reduce = late_move_reductions and depth >= lmr_min_depth and not in_check
+    lmp_move_count = 3 + depth * depth if late_move_pruning and not pv_node and depth <= lmp_max_depth and not in_check else None
 
     # if debug_search:
     #     global_depth = get_global_depth()
@@ -172,47 +578,112 @@ def negamax_alpha_beta(board, depth, alpha= -float('inf'), beta = float('inf'),
     #         logger.debug(f"Legal moves: {[board.san(move) for move in ordered_moves]}")
     
     
-    start_time = time.perf_counter()
-            
     for move in ordered_moves:
-        if remaining_time:
-            elapsed_time = time.perf_counter() - start_time
-            if elapsed_time >= remaining_time:
-                if max_eval == -float('inf'):
-                    board.push(move)
-                    eval = -negamax_alpha_beta(board, depth - 1, -beta, -alpha)
-                    board.pop()
-                    max_eval = eval
-                    alpha = max(alpha, eval)
-                elif debug_search or debug_play:
-                    logger.debug(f"Stopping search inside negamax at depth {depth} due to time limit ({elapsed_time:.4f}s ≥ {remaining_time:.4f}s)")
-                break
+        if state.stopped:
+            timed_out = True
+            break
+        if move == excluded_move:
+            continue
+        is_capture = board.is_capture(move)
+        is_quiet = not move.promotion and not is_capture
+        if (is_quiet and lmp_move_count is not None and local_positions_evaluated >= lmp_move_count
+                and max_eval > -CHECKMATE_BASE_SCORE and not board.gives_check(move)):
+            continue
+        if futile and is_quiet and not board.gives_check(move):
+            moves_pruned = True
+            continue
         local_positions_evaluated += 1
-        board.push(move)
-        eval = -negamax_alpha_beta(board, depth - 1, -beta, -alpha)
-        board.pop()
+        if state.following_pv and move != pv_move:
+            state.following_pv = False
+        board.make_move(move)
+        gives_check = board.is_check()
+
+        extension = 0
+        if can_extend:
+            if gives_check and check_extensions:
+                extension = 1
+            elif pv_node and is_capture and move.to_square == last_capture_square and recapture_extensions:
+                extension = 1
+            elif move == singular_move:
+                extension = 1
+        new_depth = depth - 1 + extension
+        child_extensions = extensions + extension
+        capture_square = move.to_square if is_capture else None
+
+        if (can_reduce and is_quiet and not extension and local_positions_evaluated > lmr_min_moves
+                and move not in killers and not gives_check):
+            reduction = LMR_TABLE[min(depth, 63)][min(local_positions_evaluated, 63)]
+            reduced_depth = max(new_depth - reduction, 1)
+        else:
+            reduced_depth = new_depth
+        if local_positions_evaluated == 1:
+            eval = -negamax_alpha_beta(board, new_depth, -beta, -alpha, ply=ply + 1,
+                                       extensions=child_extensions, last_capture_square=capture_square)
+            # Only the first line below a PV node can still be the previous PV
+            state.following_pv = False
+        else:
+            # Principal Variation Search: prove with a zero window that the move is no better than alpha,
+            # and pay for the full window only when that fails
+            eval = -negamax_alpha_beta(board, reduced_depth, -alpha - 1, -alpha, ply=ply + 1,
+                                       extensions=child_extensions, last_capture_square=capture_square)
+            if eval > alpha and reduced_depth < new_depth:
+                eval = -negamax_alpha_beta(board, new_depth, -alpha - 1, -alpha, ply=ply + 1,
+                                           extensions=child_extensions, last_capture_square=capture_square)
+            if alpha < eval < beta:
+                eval = -negamax_alpha_beta(board, new_depth, -beta, -alpha, ply=ply + 1,
+                                           extensions=child_extensions, last_capture_square=capture_square)
+        board.unmake_move()
+        if state.stopped:
+            timed_out = True
+            break
 
 
         if debug_search and depth == GLOBAL_DEPTH - 1:
             logger.debug(f"Evaluated move {board.san(move)} to score {eval}")
         
         if eval >= CHECKMATE_BASE_SCORE:
+            if eval > alpha:
+                update_pv(ply, move)
+            if excluded_move is None:
+                transposition_table.store(key, depth, BOUND_LOWER, score_to_tt(eval, ply), move)
             update_total_counters(local_positions_evaluated, local_lines_pruned, reset_ply=False)
             return eval
 
         
         if eval > max_eval:
             max_eval = eval
-        alpha = max(alpha, eval)
+            best_move = move
+        if eval > alpha:
+            alpha = eval
+            update_pv(ply, move)
         if alpha >= beta:
             local_lines_pruned += 1
+            if is_quiet:
+                update_quiet_move_tables(move, depth, ply)
             break 
 
+    if max_eval == -float('inf'):
+        if moves_pruned or excluded_move is not None or timed_out:
+            # Every move was futile or excluded, or the search was stopped: that says nothing about mate or stalemate
+            return alpha
+        # The move loop found no legal move
+        return mated_score(ply) if in_check else 0
+
+    # Partially searched nodes and searches without the excluded move must not end up in the transposition table
+    if not timed_out and excluded_move is None:
+        if max_eval >= beta:
+            bound = BOUND_LOWER
+        elif max_eval <= alpha_orig:
+            bound = BOUND_UPPER
+        else:
+            bound = BOUND_EXACT
+        transposition_table.store(key, depth, bound, score_to_tt(max_eval, ply), best_move)
+
     update_total_counters(local_positions_evaluated, local_lines_pruned, reset_ply=False)
     return max_eval
   
 
-def find_best_move(board, depth, time_budget=None):
+def find_best_move(board, depth, time_budget=None, return_pv=False):
     """
     Find the best move in the given board.
 
@@ -221,23 +692,89 @@ def find_best_move(board, depth, time_budget=None):
     Parameters:
         board (chess.Board): The chess board to search.
         depth (int): The maximum depth of the search. Must be a positive integer.
-        time_budget (float, optional): The maximum time in seconds to spend on the search. If None, the search will not be limited by time.
+        time_budget (float or TimeManager, optional): The maximum time in seconds to spend on the search, or a TimeManager
+            with the limits planned from the clock. If None, the search will not be limited by time.
+        return_pv (bool, optional): Also return the principal variation.
 
     Returns:
         tuple: A tuple containing the best move (as a chess.Move object) and the evaluation of that move (as an integer).
+            With return_pv, a third element holds the principal variation as a list of moves, starting with the best move.
     """
-    global debug_search
-    global debug_play 
+    if get_threads() > 1:
+        from engine.threaded_search import find_best_move_threaded, gil_enabled
+        backend = get_search_backend()
+        if backend == "root_split":
+            if time_budget is None:
+                from engine.root_split import find_best_move_root_split
+                return find_best_move_root_split(board, depth, return_pv=return_pv)
+            # Root splitting is for fixed-depth searches, a timed search is not reproducible anyway
+            backend = "auto"
+        if backend == "thread" or (backend == "auto" and not gil_enabled()):
+            return find_best_move_threaded(board, depth, time_budget, return_pv)
+        from engine.lazy_smp import find_best_move_lazy_smp
+        return find_best_move_lazy_smp(board, depth, time_budget, return_pv)
+
     if not board.legal_moves:
         logger.info("No legal moves available.")
-        return None, 0
+        return (None, 0, []) if return_pv else (None, 0)
+
+    get_transposition_table().new_search()
+    get_pawn_hash_table().new_search()
+    get_eval_cache().new_search()
+    best_move, max_eval, principal_variation, _ = iterative_deepening(board, depth, time_budget)
+    return (best_move, max_eval, principal_variation) if return_pv else (best_move, max_eval)
+
+
+def iterative_deepening(board, depth, time_budget=None, depth_offset=0, root_moves=None, root_alpha=-float('inf'), root_beta=float('inf')):
+    """
+    The iterative deepening loop of find_best_move, on the transposition table of this process as it is,
+    so several processes sharing one table can all run it for the same search.
+    :param board: The chess board to search, with at least one legal move
+    :param depth: The maximum depth of the search
+    :param time_budget: The maximum time in seconds to spend on the search, a TimeManager, or None
+    :param depth_offset: Search every iteration this many plies deeper, used to spread Lazy SMP helpers over different depths
+    :param root_moves: Only search these root moves, or None for all of them
+    :param root_alpha: Lower end of the window at the root. A result at or below it is only an upper bound, used by root
+                       splitting to test whether a move beats the one searched first
+    :param root_beta: Upper end of the window at the root, a result at or above it is only a lower bound
+    :return: A tuple (best_move, eval, principal_variation, completed_depth), where completed_depth is the depth of the
+             last iteration that was searched to the end (0 if none was)
+    """
+    global debug_search
+    global debug_play 
+    global transposition_table
+
+    time_manager = as_time_manager(time_budget)
+    root_board = board
+    # The search works on its own copy that keeps the Zobrist key up to date incrementally
+    board = SearchBoard.from_board(board)
+    board.mark_search_root()
+    load_search_parameters()
+    transposition_table = get_transposition_table()
+    clear_killer_moves()
+    age_history_table()
+    state.stopped = False
+    state.nodes = 0
+    state.seldepth = 0
+    state.next_stop_poll = STOP_POLL_NODES
+    state.time_manager = time_manager
+    state.search_start = state.last_info_time = time.perf_counter()
+    pv_table = state.pv_table
+    pv_length = state.pv_length
+    root_key = board.zobrist_key
+    root_entry = transposition_table.probe(root_key)
 
     best_move = None
+    principal_variation = []
+    state.previous_pv = []
     local_positions_evaluated = 0
     local_lines_pruned = 0
-    ordered_moves = order_moves(board)
+    ordered_moves = order_moves(board, tt_move=root_entry[3] if root_entry else None)
+    if root_moves is not None:
+        ordered_moves = [move for move in ordered_moves if move in root_moves]
     previous_move_evals = None
-    calculate_game_phase(board)
+    if time_manager is not None:
+        time_manager.start_search(root_board, len(ordered_moves))
     # if time_budget:
     #     if time_budget <= 9:
     #         depth = 3
@@ -255,91 +792,166 @@ def find_best_move(board, depth, time_budget=None):
     #             logger.debug(f"Time budget is {time_budget:.4f}s, using full depth and full quiescence search")
         
 
-    start_time = time.perf_counter()
+    aspiration_window = get_aspiration_window()
+    max_eval = -float('inf')
+    # Score of the last completed iteration, the centre of the next aspiration window
+    search_eval = None
+    completed_depth = 0
 
-    for local_depth in range(1, depth + 1):
-        elapsed_time = time.perf_counter() - start_time
-        if time_budget and best_move and elapsed_time * 1.5 >= time_budget:
+    for local_depth in range(1 + depth_offset, depth + depth_offset + 1):
+        if poll_stop():
+            break
+        if time_manager is not None and best_move and time_manager.should_stop_iteration():
             if debug_search or debug_play:
-                logger.debug(f"Stopped search after completing depth {local_depth - 1} since we're approaching the time limit ({elapsed_time:.4f}s ≥ {time_budget:.4f}s)")
+                logger.debug(f"Stopped search after completing depth {local_depth - 1} ({time_manager.elapsed():.4f}s of {time_manager.target_time():.4f}s)")
             break
 
         if debug_search:
             logger.debug(f"========================================= \nIterative deepening at depth {local_depth} \n=========================================")
         
         set_iterative_depth(local_depth)
+        state.current_depth = local_depth
         
 
-        max_eval = -float('inf')
-        alpha = -float('inf')
-        beta = float('inf')
-        current_move_evals = {}
-
         if previous_move_evals:
-            ordered_moves = dict(sorted(previous_move_evals.items(), key=lambda item: item[1], reverse=True)).keys()
-        if debug_search:
-            logger.debug(f"Searching depth {local_depth}")
-            logger.debug(f"Current board: \n{print_board_clean(board)}")
-            logger.debug(f"Alpha: {alpha}, Beta: {beta}")
-            logger.debug(f" searching moves in order {[board.san(move) for move in ordered_moves]}")      
-        
-        total_moves = len(ordered_moves)
-        moves_searched = 0
-        for move in ordered_moves:
-            move_search_time = time.perf_counter()
-            elapsed_time = move_search_time - start_time
-            remaining_time = time_budget - elapsed_time if time_budget else None
-            moves_searched += 1
-
-            # Predict if continuing this depth will exceed budget by projecting current time usage
-            if time_budget and elapsed_time >= time_budget:
-                # Only bail early if we're bailing before ~80% of moves have been searched
-                if moves_searched / total_moves < 0.8: 
-                    if max_eval == -float('inf'):
-                        board.push(move)
-                        eval = -negamax_alpha_beta(board, local_depth - 1, -beta, -alpha, remaining_time = remaining_time)
-                        board.pop()
-                        max_eval = eval
-                        alpha = max(alpha, eval)
+            ordered_moves = list(dict(sorted(previous_move_evals.items(), key=lambda item: item[1], reverse=True)).keys())
+
+        # Aspiration window around the score of the previous iteration, the full window at depth 1 and around mate scores
+        window = aspiration_window
+        if search_eval is None or abs(search_eval) >= CHECKMATE_BASE_SCORE or not root_alpha < search_eval < root_beta:
+            window_alpha, window_beta = root_alpha, root_beta
+        else:
+            window_alpha, window_beta = max(search_eval - window, root_alpha), min(search_eval + window, root_beta)
+
+        while True:
+            alpha = window_alpha
+            beta = window_beta
+            iteration_best_move = None
+            iteration_eval = -float('inf')
+            iteration_pv = []
+            current_move_evals = {}
+            state.following_pv = bool(state.previous_pv) and ordered_moves[0] == state.previous_pv[0]
+
+            if debug_search:
+                logger.debug(f"Searching depth {local_depth}")
+                logger.debug(f"Current board: \n{print_board_clean(board)}")
+                logger.debug(f"Alpha: {alpha}, Beta: {beta}")
+                logger.debug(f" searching moves in order {[board.san(move) for move in ordered_moves]}")      
+
+            iteration_completed = True
+            for move in ordered_moves:
+                move_search_time = time.perf_counter()
+                # Stop events and the hard time limit are polled at every root move, and every STOP_POLL_NODES nodes below
+                if poll_stop():
                     if debug_search or debug_play:
-                        logger.debug(f"Stopping search during depth {local_depth} due to time limit ({elapsed_time:.4f}s ≥ {time_budget:.4f}s)")
+                        logger.debug(f"Stopping search during depth {local_depth}")
+                    iteration_completed = False
+                    break
+                if debug_search:
+                    logger.debug(f"Evaluating move: {board.san(move)}")
+
+                local_positions_evaluated += 1
+                board.make_move(move)
+                if board.is_checkmate():
+                    board.unmake_move()
+                    if state.info_handler is not None:
+                        send_info(-mated_score(1), [move])
+                    end_search()
+                    return move, -mated_score(1), [move], local_depth
+                if iteration_best_move is None:
+                    eval = -negamax_alpha_beta(board, local_depth - 1, -beta, -alpha)
+                    state.following_pv = False
+                else:
+                    # Principal Variation Search: a zero-window probe, re-searched only if the move beats the best one so far
+                    eval = -negamax_alpha_beta(board, local_depth - 1, -alpha - 1, -alpha)
+                    if alpha < eval < beta:
+                        eval = -negamax_alpha_beta(board, local_depth - 1, -beta, -alpha)
+                board.unmake_move()
+                if state.stopped:
+                    iteration_completed = False
+                    break
+                if eval >= CHECKMATE_BASE_SCORE:
+                    if state.info_handler is not None:
+                        send_info(eval, [move] + pv_table[1][1:pv_length[1]])
+                    end_search()
+                    return move, eval, [move] + pv_table[1][1:pv_length[1]], local_depth
+                current_move_evals[move] = eval
+                if debug_search:
+                    move_search_time = time.perf_counter() - move_search_time
+                    logger.debug(f"Move {board.san(move)} evaluated in {move_search_time:.4f} seconds")
+                    logger.debug(f"Evaluated move {board.san(move)} to score {eval}")
+
+                if eval > iteration_eval:
+                    iteration_eval = eval
+                    iteration_best_move = move
+                    iteration_pv = [move] + pv_table[1][1:pv_length[1]]
+
+                alpha = max(alpha, eval)
+                if alpha >= beta:
                     break
 
+            if not iteration_completed:
+                break
+            # Widen the side of the window the score fell out of, and search the depth again. A score beyond the root
+            # window is a bound, which is all the caller asked for
+            if window_alpha > root_alpha and iteration_eval <= window_alpha:
+                window *= 2
+                window_alpha = root_alpha if window > ASPIRATION_MAX_WINDOW else max(iteration_eval - window, root_alpha)
+            elif window_beta < root_beta and iteration_eval >= window_beta:
+                window *= 2
+                window_beta = root_beta if window > ASPIRATION_MAX_WINDOW else min(iteration_eval + window, root_beta)
+                ordered_moves.remove(iteration_best_move)
+                ordered_moves.insert(0, iteration_best_move)
+            else:
+                break
             if debug_search:
-                logger.debug(f"Evaluating move: {board.san(move)}")
-
-            local_positions_evaluated += 1
-            board.push(move)
-            if board.is_checkmate():
-                board.pop()
-                return move, CHECKMATE_BASE_SCORE + qDepth + GLOBAL_DEPTH
-            eval = -negamax_alpha_beta(board, local_depth - 1, -beta, -alpha, remaining_time = remaining_time)
-            board.pop()
-            if eval >= CHECKMATE_BASE_SCORE:
-                return move, eval
-            current_move_evals[move] = eval
-            if debug_search:
-                move_search_time = time.perf_counter() - move_search_time
-                logger.debug(f"Move {board.san(move)} evaluated in {move_search_time:.4f} seconds")
-                logger.debug(f"Evaluated move {board.san(move)} to score {eval}")
-
-            if eval > max_eval:
-                max_eval = eval
-                best_move = move
-                
-            alpha = max(alpha, eval)
-        previous_move_evals = current_move_evals
-        if debug_search:
+                logger.debug(f"Score {iteration_eval} outside the aspiration window, searching depth {local_depth} again with ({window_alpha}, {window_beta})")
+
+        # Moves of a partial iteration were searched to the end before it stopped, the best of them is at least
+        # as good as the previous best move (searched first) once it scored inside the window
+        if iteration_best_move is not None and (iteration_completed or iteration_eval > window_alpha):
+            best_move = iteration_best_move
+            max_eval = iteration_eval
+            principal_variation = iteration_pv
+        elif best_move is None:
+            max_eval = iteration_eval
+        if iteration_completed:
+            completed_depth = local_depth
+            search_eval = iteration_eval
+            state.previous_pv = principal_variation
+            # A partial iteration only scored some of the moves, keep the previous order
+            previous_move_evals = current_move_evals
+            if time_manager is not None:
+                time_manager.update(best_move, max_eval)
+        if iteration_completed and best_move:
+            bound = BOUND_UPPER if max_eval <= root_alpha else BOUND_LOWER if max_eval >= root_beta else BOUND_EXACT
+            transposition_table.store(root_key, local_depth, bound, score_to_tt(max_eval, 0), best_move)
+        if state.info_handler is not None and best_move is not None and (iteration_completed or best_move is iteration_best_move):
+            send_info(max_eval, principal_variation)
+        if debug_search and best_move:
             logger.debug(f"Best move at depth {local_depth}: {board.san(best_move)} with evaluation {max_eval}")
+            logger.debug(f"Principal variation: {' '.join(move.uci() for move in principal_variation)}")
             
+    if best_move is None:
+        # Stopped before even the first iteration had a result, but a move has to be played all the same
+        best_move = ordered_moves[0]
+        principal_variation = [best_move]
+        if max_eval == -float('inf'):
+            max_eval = 0
     logger.info(f"Best move: {best_move}, Evaluation: {max_eval}")
     update_total_counters(local_positions_evaluated, local_lines_pruned, reset_ply=True)
+    if debug_tt:
+        logger.debug(f"Transposition table: {transposition_table.hits}/{transposition_table.probes} hits, hashfull {transposition_table.hashfull()}")
+        pawn_hash_table = get_pawn_hash_table()
+        logger.debug(f"Pawn hash table: {pawn_hash_table.hits}/{pawn_hash_table.probes} hits")
+        eval_cache = get_eval_cache()
+        logger.debug(f"Evaluation cache: {eval_cache.hits} hits, {eval_cache.misses} misses")
 
     if debug_search or debug_play:
-        logger.debug(f"Search ended at depth {local_depth - 1 if elapsed_time >= time_budget else local_depth}")
+        logger.debug(f"Search ended after completing depth {completed_depth}")
 
-    
-    return best_move, max_eval
+    end_search()
+    return best_move, max_eval, principal_variation, completed_depth
 
 
 
@@ -0,0 +1,90 @@
+#threaded_search.py
+import sys
+import threading
+
+from utils.log import logger
+from utils.debug_config import get_debug_config
+from utils.config import get_threads
+from utils.counters import get_total_counters, add_total_counters
+from engine.transposition_table import get_transposition_table
+import engine.search as search
+
+
+debug_smp = get_debug_config("lazy_smp")
+
+
+def gil_enabled():
+    """
+    Whether this interpreter runs with the GIL. Only free-threaded builds (Python 3.13+) can disable it.
+    """
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return True if is_gil_enabled is None else is_gil_enabled()
+
+
+def helper_thread(board, depth, depth_offset, stop, results, helper_id):
+    """
+    Body of a helper thread. The killer, history and PV tables and the node counters it uses are its own
+    (see SearchState and CounterState); only the transposition table is shared with the other threads.
+    It has no time limit of its own, the calling thread stops it once its own search is done.
+    """
+    search.set_stop_event(stop)
+    try:
+        best_move, eval, principal_variation, completed_depth = search.iterative_deepening(board, depth, depth_offset=depth_offset)
+        results[helper_id] = (completed_depth, best_move, eval, principal_variation, get_total_counters())
+    except Exception:
+        logger.exception(f"Search thread {helper_id} failed")
+
+
+def find_best_move_threaded(board, depth, time_budget=None, return_pv=False):
+    """
+    Lazy SMP with threads instead of processes: get_threads() - 1 helper threads search the same root as the calling
+    thread, every other one a ply deeper, on the transposition table of this process. There is no process startup and
+    nothing to serialize, but the threads only run in parallel on a free-threaded build. With the GIL they would just
+    take turns, so there the search falls back to a single thread.
+
+    Takes the same arguments and returns the same tuple as find_best_move.
+    """
+    if not board.legal_moves:
+        logger.info("No legal moves available.")
+        return (None, 0, []) if return_pv else (None, 0)
+
+    helpers = get_threads() - 1
+    if gil_enabled():
+        if debug_smp:
+            logger.debug("Threaded search: the GIL is enabled, searching with a single thread")
+        helpers = 0
+
+    get_transposition_table().new_search()
+    # Stops the helpers once the calling thread is done; the calling thread keeps the stop event it already polls
+    stop = threading.Event()
+    results = [None] * (helpers + 1)
+    threads = [
+        threading.Thread(target=helper_thread, name=f"search-helper-{helper_id}", daemon=True,
+                         args=(board.copy(), depth, helper_id % 2, stop, results, helper_id))
+        for helper_id in range(1, helpers + 1)
+    ]
+    for thread in threads:
+        thread.start()
+
+    try:
+        best_move, max_eval, principal_variation, completed_depth = search.iterative_deepening(board, depth, time_budget)
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    chosen_by = 0
+    for helper_id in range(1, helpers + 1):
+        if results[helper_id] is None:
+            continue
+        helper_depth, helper_move, helper_eval, helper_pv, (positions_evaluated, lines_pruned) = results[helper_id]
+        add_total_counters(positions_evaluated, lines_pruned)
+        if debug_smp:
+            logger.debug(f"Search thread {helper_id}: depth {helper_depth}, {helper_move} ({helper_eval})")
+        if helper_move is not None and helper_depth > completed_depth:
+            best_move, max_eval, principal_variation, completed_depth = helper_move, helper_eval, helper_pv, helper_depth
+            chosen_by = helper_id
+
+    if debug_smp and helpers:
+        logger.debug(f"Threaded search: playing {best_move} from {'thread ' + str(chosen_by) if chosen_by else 'the main thread'} at depth {completed_depth}")
+    return (best_move, max_eval, principal_variation) if return_pv else (best_move, max_eval)
@@ -0,0 +1,170 @@
+#time_manager.py
+import time
+
+
+from utils.log import logger
+from utils.debug_config import get_debug_config
+from utils.config import get_move_overhead
+from utils.game_phase import calculate_game_phase, PHASE_OPENING, PHASE_MIDGAME
+
+
+debug_play = get_debug_config("play")
+
+# Never plan less than this, a search needs a little time to return any move at all
+MIN_THINK_TIME = 0.02
+# The hard limit is at most this many times the optimum time, and at most this share of the clock
+MAX_OPTIMUM_RATIO = 3
+MAX_CLOCK_SHARE = 0.4
+# Share of the increment added to the time per move
+INCREMENT_SHARE = 0.9
+# A new iteration usually takes longer than all the previous ones together, so none is started after this share of the target time
+NEXT_ITERATION_SHARE = 0.6
+# Score drop in centipawns between two iterations from which the search gets more time, and the drop that doubles it
+SCORE_DROP_MARGIN = 30
+SCORE_DROP_MAX = 200
+# Iterations in a row with the same best move after which it counts as obvious, and the share of the time it then gets
+STABLE_ITERATIONS = 4
+STABLE_SHARE = 0.6
+# Share of the time for a recapture that has been the best move for two iterations
+RECAPTURE_SHARE = 0.4
+
+
+def expected_moves_left(board):
+    """
+    Rough number of moves still to play in the game, used to split the clock when the GUI does not send movestogo.
+    """
+    phase = calculate_game_phase(board)
+    if phase == PHASE_OPENING:
+        return 40
+    elif phase == PHASE_MIDGAME:
+        return 30
+    return 20
+
+
+class TimeManager:
+    """
+    The time limits of one search:
+        - the optimum time is what the move should take normally. It decides whether a new iteration is started,
+          scaled at every completed iteration: up when the best move keeps changing or the score drops, down when
+          the best move has been the same for a while or is an obvious recapture, and to nothing with a single legal move.
+        - the hard limit is checked by the search itself every STOP_POLL_NODES nodes (see poll_stop in engine/search.py),
+          so it stops in the middle of an iteration.
+    The clock starts when the manager is created, i.e. when the go command is received. While pondering neither limit
+    applies, until ponderhit restarts the clock.
+    """
+
+    def __init__(self, optimum=None, maximum=None, pondering=False):
+        """
+        :param optimum: The optimum time in seconds, None for no limit
+        :param maximum: The hard limit in seconds, the optimum time if None
+        :param pondering: Whether the search starts on the opponent's time
+        """
+        self.optimum = optimum
+        self.maximum = maximum if maximum is not None else optimum
+        self.pondering = pondering
+        self.start_time = time.perf_counter()
+        self.forced = False
+        self.recapture_square = None
+        self.best_move = None
+        self.previous_eval = None
+        self.instability = 0.0
+        self.stable_iterations = 0
+        self.score_drop = 0
+
+    @classmethod
+    def from_clock(cls, board, time_left, increment=0, using_movetime=False, moves_to_go=None, pondering=False):
+        """
+        Plan the time for a move from the clock.
+        :param board: The position to move in
+        :param time_left: The time left on our clock in seconds, or the fixed time per move with using_movetime
+        :param increment: The increment per move in seconds
+        :param using_movetime: Whether time_left is a fixed time per move
+        :param moves_to_go: Moves until the next time control, estimated from the game phase if None
+        :param pondering: Whether the search starts on the opponent's time
+        """
+        available = max(MIN_THINK_TIME, time_left - get_move_overhead())
+        if using_movetime:
+            return cls(available, available, pondering)
+
+        if not moves_to_go:
+            moves_to_go = expected_moves_left(board)
+        optimum = available / moves_to_go + INCREMENT_SHARE * (increment or 0)
+        maximum = max(MIN_THINK_TIME, min(optimum * MAX_OPTIMUM_RATIO, available * MAX_CLOCK_SHARE))
+        optimum = min(optimum, maximum)
+        if debug_play:
+            logger.debug(f"Time manager: {time_left:.2f}s left, {moves_to_go} moves to go, optimum {optimum:.2f}s, hard limit {maximum:.2f}s")
+        return cls(optimum, maximum, pondering)
+
+    def elapsed(self):
+        return time.perf_counter() - self.start_time
+
+    def ponderhit(self):
+        """
+        The opponent played the move we pondered on: from now on the search runs on our clock.
+        """
+        self.start_time = time.perf_counter()
+        self.pondering = False
+
+    def start_search(self, board, legal_move_count):
+        """
+        Look at the root before the first iteration.
+        :param board: The root position, a chess.Board with its move stack
+        :param legal_move_count: The number of legal moves at the root
+        """
+        self.forced = legal_move_count == 1
+        self.recapture_square = None
+        if board.move_stack:
+            last_move = board.peek()
+            previous = board.copy(stack=1)
+            previous.pop()
+            if previous.is_capture(last_move):
+                self.recapture_square = last_move.to_square
+
+    def update(self, best_move, eval):
+        """
+        Record the result of a completed iteration.
+        """
+        if self.best_move is None or best_move == self.best_move:
+            self.stable_iterations += 1
+            self.instability *= 0.5
+        else:
+            self.stable_iterations = 0
+            self.instability = self.instability * 0.5 + 1
+        self.score_drop = self.previous_eval - eval if self.previous_eval is not None else 0
+        self.best_move = best_move
+        self.previous_eval = eval
+
+    def target_time(self):
+        """
+        The optimum time scaled by what the iterations so far found.
+        """
+        if self.forced:
+            return 0
+        scale = 1 + self.instability
+        if self.score_drop > SCORE_DROP_MARGIN:
+            scale *= 1 + min(self.score_drop, SCORE_DROP_MAX) / SCORE_DROP_MAX
+        if self.stable_iterations >= STABLE_ITERATIONS:
+            scale *= STABLE_SHARE
+        if self.best_move is not None and self.best_move.to_square == self.recapture_square and self.stable_iterations >= 2:
+            scale *= RECAPTURE_SHARE
+        return min(self.optimum * scale, self.maximum)
+
+    def should_stop_iteration(self):
+        """
+        Whether to play the result of the last completed iteration instead of starting another one.
+        """
+        if self.pondering or self.optimum is None:
+            return False
+        return self.elapsed() >= self.target_time() * NEXT_ITERATION_SHARE
+
+    def hard_limit_reached(self):
+        return not self.pondering and self.maximum is not None and time.perf_counter() - self.start_time >= self.maximum
+
+
+def as_time_manager(time_budget):
+    """
+    Turn the time_budget argument of the search, seconds or a TimeManager, into a TimeManager, or None for no limit.
+    """
+    if time_budget is None or isinstance(time_budget, TimeManager):
+        return time_budget
+    return TimeManager(time_budget)
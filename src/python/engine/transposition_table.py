@@ -0,0 +1,253 @@
+#transposition_table.py
+import chess
+
+from utils.log import logger
+from utils.debug_config import get_debug_config
+from utils.config import get_tt_size_mb
+from utils.constants import CHECKMATE_BASE_SCORE
+
+
+debug_tt = get_debug_config("transposition_table")
+
+BOUND_EXACT = 0
+BOUND_LOWER = 1
+BOUND_UPPER = 2
+
+# Every entry is two 64-bit words: the full Zobrist key xor the data word, and a packed data word
+ENTRY_SIZE_BYTES = 16
+# Slot 0 of a bucket is depth-preferred, slot 1 is always-replace
+SLOTS_PER_BUCKET = 2
+
+# Packed data word layout:
+#   bits  0-15  move (from 6 | to 6 | promotion piece type 3)
+#   bits 16-23  depth
+#   bits 24-25  bound type
+#   bits 26-31  search generation (age)
+#   bits 32-63  score, offset by 2**31
+MOVE_MASK = 0xFFFF
+DEPTH_SHIFT = 16
+BOUND_SHIFT = 24
+GENERATION_SHIFT = 26
+GENERATION_MASK = 0x3F
+SCORE_SHIFT = 32
+SCORE_OFFSET = 1 << 31
+MAX_STORED_DEPTH = 0xFF
+
+# clear() zeroes the buffer a chunk at a time from this block, rather than allocating a zeroed copy of the whole table
+ZERO_CHUNK = bytes(1 << 20)
+
+
+def encode_move(move):
+    """
+    Pack a move into 16 bits. A null move or None is stored as 0.
+    """
+    if not move:
+        return 0
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+
+def decode_move(packed_move):
+    """
+    Unpack a move stored with encode_move. Returns None for an empty move.
+    """
+    if not packed_move:
+        return None
+    promotion = packed_move >> 12
+    return chess.Move(packed_move & 0x3F, (packed_move >> 6) & 0x3F, promotion or None)
+
+
+def score_to_tt(score, ply):
+    """
+    Convert a mate score from "distance to the root" to "distance to this node" before storing it,
+    so the entry stays valid when the position is reached at another ply.
+    """
+    if score >= CHECKMATE_BASE_SCORE:
+        return score + ply
+    if score <= -CHECKMATE_BASE_SCORE:
+        return score - ply
+    return score
+
+
+def score_from_tt(score, ply):
+    """
+    Inverse of score_to_tt: turn a stored mate score back into a score relative to the root.
+    """
+    if score >= CHECKMATE_BASE_SCORE:
+        return score - ply
+    if score <= -CHECKMATE_BASE_SCORE:
+        return score + ply
+    return score
+
+
+def table_size_bytes(size_mb):
+    """
+    Number of bytes of the buffer backing a table of the given size, e.g. to allocate shared memory for it.
+    """
+    num_buckets = max(1, (size_mb * 1024 * 1024) // (ENTRY_SIZE_BYTES * SLOTS_PER_BUCKET))
+    return num_buckets * SLOTS_PER_BUCKET * ENTRY_SIZE_BYTES
+
+
+class TranspositionTable:
+    """
+    Fixed-size transposition table keyed by Zobrist hash, backed by one flat buffer of 64-bit words.
+
+    Entries live in buckets of two slots. The first slot keeps the deepest result seen for the bucket
+    (unless it is from an older search), the second slot is always overwritten, so shallow results near
+    the leaves can never push out the expensive ones near the root.
+
+    The buffer can be shared memory used by several search processes at once, without any locking.
+    Each entry stores key ^ data next to data, so an entry torn by two processes writing it at the same
+    time no longer matches its key and simply reads as a miss.
+    """
+
+    def __init__(self, size_mb, buffer=None):
+        """
+        :param size_mb: The size of the table in megabytes
+        :param buffer: An existing writable buffer of table_size_bytes(size_mb) bytes to use, e.g. shared memory.
+                       A private zeroed buffer is allocated if None.
+        """
+        self.size_mb = size_mb
+        self.num_buckets = max(1, (size_mb * 1024 * 1024) // (ENTRY_SIZE_BYTES * SLOTS_PER_BUCKET))
+        self.num_entries = self.num_buckets * SLOTS_PER_BUCKET
+        if buffer is None:
+            buffer = bytearray(self.num_entries * ENTRY_SIZE_BYTES)
+        self.memory = memoryview(buffer)[:self.num_entries * ENTRY_SIZE_BYTES]
+        self.words = self.memory.cast("Q")
+        self.keys = self.words[:self.num_entries]
+        self.data = self.words[self.num_entries:]
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+        if debug_tt:
+            logger.debug(f"Transposition table allocated: {size_mb} MB, {self.num_entries} entries")
+
+    def clear(self):
+        """
+        Wipe every entry, e.g. when a new game starts. The buffer is zeroed in place, so shared tables are cleared for every process.
+        """
+        memory = self.memory
+        chunk = len(ZERO_CHUNK)
+        for start in range(0, len(memory), chunk):
+            end = min(start + chunk, len(memory))
+            memory[start:end] = ZERO_CHUNK[:end - start]
+        self.generation = 0
+
+    def release(self):
+        """
+        Drop the views on the buffer, which must be done before shared memory behind the table can be closed.
+        The table cannot be used afterwards.
+        """
+        for view in (self.keys, self.data, self.words, self.memory):
+            view.release()
+
+    def new_search(self):
+        """
+        Advance the generation counter so entries from earlier searches become replaceable.
+        """
+        self.generation = (self.generation + 1) & GENERATION_MASK
+        self.probes = 0
+        self.hits = 0
+
+    def probe(self, key):
+        """
+        Look up a position.
+        :param key: The Zobrist key of the position
+        :return: A tuple (depth, bound, score, move) or None if the position is not stored.
+                 The score is as stored; convert mate scores with score_from_tt.
+        """
+        self.probes += 1
+        index = (key % self.num_buckets) * SLOTS_PER_BUCKET
+        data = self.data[index]
+        if self.keys[index] ^ data != key:
+            data = self.data[index + 1]
+            if self.keys[index + 1] ^ data != key:
+                return None
+        if not data:
+            return None
+        self.hits += 1
+        return (
+            (data >> DEPTH_SHIFT) & 0xFF,
+            (data >> BOUND_SHIFT) & 0x3,
+            (data >> SCORE_SHIFT) - SCORE_OFFSET,
+            decode_move(data & MOVE_MASK),
+        )
+
+    def store(self, key, depth, bound, score, move):
+        """
+        Store a search result.
+        :param key: The Zobrist key of the position
+        :param depth: The remaining depth the score was searched to (0 for quiescence)
+        :param bound: BOUND_EXACT, BOUND_LOWER or BOUND_UPPER
+        :param score: The score, already converted with score_to_tt
+        :param move: The best move found, or None
+        """
+        index = (key % self.num_buckets) * SLOTS_PER_BUCKET
+        depth = min(max(depth, 0), MAX_STORED_DEPTH)
+        packed_move = encode_move(move)
+
+        keys = self.keys
+        data = self.data
+        slot_data = data[index]
+        slot_depth = (slot_data >> DEPTH_SHIFT) & 0xFF
+        slot_generation = (slot_data >> GENERATION_SHIFT) & GENERATION_MASK
+        if not slot_data or keys[index] ^ slot_data == key or depth >= slot_depth or slot_generation != self.generation:
+            target = index
+        else:
+            target = index + 1
+
+        # Keep the old best move if this result did not produce one
+        if not packed_move:
+            old_data = data[target]
+            if keys[target] ^ old_data == key:
+                packed_move = old_data & MOVE_MASK
+
+        new_data = (
+            packed_move
+            | (depth << DEPTH_SHIFT)
+            | (bound << BOUND_SHIFT)
+            | (self.generation << GENERATION_SHIFT)
+            | ((int(score) + SCORE_OFFSET) << SCORE_SHIFT)
+        )
+        data[target] = new_data
+        keys[target] = key ^ new_data
+
+    def hashfull(self):
+        """
+        Estimate how full the table is in permille, by sampling the first 1000 entries for the current search.
+        """
+        sample = min(1000, self.num_entries)
+        used = 0
+        for i in range(sample):
+            slot_data = self.data[i]
+            if slot_data and (slot_data >> GENERATION_SHIFT) & GENERATION_MASK == self.generation:
+                used += 1
+        return used * 1000 // sample
+
+
+transposition_table = None
+
+
+def get_transposition_table():
+    """
+    Get the transposition table of this process, (re)allocating it if the configured size has changed.
+    """
+    global transposition_table
+    size_mb = get_tt_size_mb()
+    if transposition_table is None or transposition_table.size_mb != size_mb:
+        transposition_table = TranspositionTable(size_mb)
+    return transposition_table
+
+
+def set_transposition_table(table):
+    """
+    Make the search use the given table, e.g. one backed by shared memory for a multi-process search.
+    """
+    global transposition_table
+    transposition_table = table
+
+
+def clear_transposition_table():
+    """
+    Clear the transposition table, e.g. on ucinewgame.
+    """
+    get_transposition_table().clear()
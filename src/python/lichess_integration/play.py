@@ -11,69 +11,51 @@ sys.path.insert(0, str(project_root))
 
 
 from engine.search import find_best_move  
+from engine.time_manager import TimeManager
 from utils.log import logger
 from utils.debug_config import get_debug_config
 from utils.config import get_global_depth
-from utils.game_phase import calculate_game_phase, get_last_logged_phase, PHASE_ENDGAME, PHASE_MIDGAME, PHASE_OPENING
+from utils.game_phase import calculate_game_phase, PHASE_ENDGAME, PHASE_MIDGAME, PHASE_OPENING
 
 debug_play = get_debug_config("play")
 
 
 
-def play_board(board: chess.Board, total_time_left: float = None, increment: float = None, using_movetime: bool = False) -> str:
+def play_board(board: chess.Board, total_time_left: float = None, increment: float = None, using_movetime: bool = False, return_ponder: bool = False,
+               moves_to_go: int = None, time_manager: TimeManager = None):
     """
     Play a move on the given board with an optional time limit.
     
     Parameters:
         board (chess.Board): The chess board to play on.
-        time_limit (float, optional): The time limit for the move in seconds. Defaults to None.
+        total_time_left (float, optional): The time left on our clock in seconds, or the fixed move time with using_movetime.
+        increment (float, optional): The increment per move in seconds.
+        using_movetime (bool, optional): Whether total_time_left is a fixed time per move.
+        return_ponder (bool, optional): Also return the expected reply of the opponent, to ponder on.
+        moves_to_go (int, optional): Moves until the next time control, if the GUI sent it.
+        time_manager (TimeManager, optional): The limits of the move, already planned when the go command was received.
+            Replaces the clock arguments, whose limits would otherwise only start now.
         
     Returns:
         str: The UCI representation of the chosen move.
+            With return_ponder, a tuple of that and the UCI representation of the expected reply (None if there is none).
     """
-    start_time = time.perf_counter()
-    phase = calculate_game_phase(board)
-
-    if total_time_left and not using_movetime:
-        if debug_play:
-            logger.debug("using_movetime=False =>  Calculating move time based on game phase")
-        if phase == PHASE_OPENING:
-            expected_moves_left = 40
-        elif phase == PHASE_MIDGAME:
-            expected_moves_left = 30
-        else:
-            expected_moves_left = 20
-        move_time = (total_time_left / expected_moves_left) 
-        if increment:
-            move_time += 0.95 * increment
-            if debug_play:
-                logger.debug(f"Adding increment: {increment} to move time: {move_time}")
-        if debug_play:
-            logger.debug(f"Using expected moves left: {expected_moves_left}")
-            logger.debug(f"Current move_time set to {move_time}")
-        move_time = min(move_time, total_time_left * 0.6)
-        if debug_play:
-            logger.debug(f"Current move_time set to {move_time} after checking against total time left")
-        move_time = max(0.5, move_time)
-        if debug_play:
-            logger.debug(f"Final move_time set to {move_time} after making sure it's at least 0.5s")
-    elif total_time_left and using_movetime:
-        if debug_play:
-            logger.debug("using_movetime=True =>  Using total time left as the move time")
-        move_time = total_time_left
-    else:
-        move_time = 5.0  # Fallback default
+    if time_manager is None and total_time_left:
+        time_manager = TimeManager.from_clock(board, total_time_left, increment, using_movetime, moves_to_go)
+    elif time_manager is None:
+        time_manager = TimeManager(5.0)  # Fallback default
         if debug_play:
             logger.debug("No time limit provided, using default move time of 5.0 seconds")
-    if debug_play:
-        logger.debug(f"Using move time: {move_time:.2f}s")
 
     depth = get_global_depth()
-    move, eval = find_best_move(board, depth=depth, time_budget=move_time)
+    move, eval, principal_variation = find_best_move(board, depth=depth, time_budget=time_manager, return_pv=True)
 
-    think_time = time.perf_counter() - start_time
+    think_time = time_manager.elapsed()
 
-    logger.info(f"Chosen move: {move}, Time spent: {think_time:.2f}s / {move_time:.2f}s, My eval estimate: {eval:.2f}")
+    logger.info(f"Chosen move: {move}, Time spent: {think_time:.2f}s / {time_manager.optimum:.2f}s (hard limit {time_manager.maximum:.2f}s), My eval estimate: {eval:.2f}")
+    if return_ponder:
+        ponder_move = principal_variation[1] if len(principal_variation) > 1 else None
+        return move.uci(), ponder_move.uci() if ponder_move else None
     return move.uci()
 
 
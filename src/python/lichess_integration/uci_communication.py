@@ -1,6 +1,8 @@
 
 import sys
 import chess
+import queue
+import threading
 import time
 from pathlib import Path
 
@@ -8,34 +10,339 @@ project_root = Path(__file__).resolve().parents[1]  # this is src/python
 sys.path.insert(0, str(project_root))
 
 from lichess_integration.play import play_board
+from engine.search import find_best_move, set_stop_event, set_info_handler, reset_search_state
+from engine.transposition_table import clear_transposition_table
+from engine.evaluation.pawn_structure import get_pawn_hash_table
+from engine.evaluation.eval_cache import get_eval_cache
+from engine.time_manager import TimeManager
 from utils.log import logger, configure_logging
+from utils.config import get_threads, set_threads, get_move_overhead, set_move_overhead
+from utils.constants import MAX_SEARCH_PLY, CHECKMATE_BASE_SCORE
 from ui.terminal_prints import print_board_clean
 
 board = chess.Board()
 configure_logging("debug", save_to_file=True, logdir="../../.logs/games", category="uci")
 using_movetime = False
+search_worker = None
+# Lines read from stdin, in order, by the reader thread
+commands = queue.Queue()
+
+# Depth limit of go infinite and go ponder, which normally run until stop or ponderhit
+INFINITE_DEPTH = MAX_SEARCH_PLY // 4
+
+
+class OutputWriter:
+    """
+    Writes lines to stdout from a background thread. The search only appends its info lines to a queue, so a slow
+    GUI or pipe never holds it up, and lines queued at the same time go out in a single write and flush.
+    The search worker and the loop both write through it, so their lines keep their order.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.lines = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self.run, name="uci-writer", daemon=True)
+        self.thread.start()
+
+    def write(self, line):
+        self.lines.put(line)
+
+    def run(self):
+        closed = False
+        while not closed:
+            batch = [self.lines.get()]
+            while True:
+                try:
+                    batch.append(self.lines.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                closed = True
+                batch = batch[:batch.index(None)]
+            if batch:
+                self.stream.write("\n".join(batch) + "\n")
+                self.stream.flush()
+
+    def close(self):
+        """
+        Write everything still queued and stop the writer thread.
+        """
+        self.lines.put(None)
+        self.thread.join()
+
+
+output = OutputWriter(sys.stdout)
+
+
+def send(line):
+    output.write(line)
+
+
+def uci_score(score):
+    """
+    The score of an info line: centipawns, or moves to mate (negative when we are getting mated).
+    """
+    score = int(score)
+    if score >= CHECKMATE_BASE_SCORE:
+        return f"mate {(CHECKMATE_BASE_SCORE + MAX_SEARCH_PLY - score + 1) // 2}"
+    if score <= -CHECKMATE_BASE_SCORE:
+        return f"mate -{(CHECKMATE_BASE_SCORE + MAX_SEARCH_PLY + score) // 2}"
+    return f"cp {score}"
+
+
+def send_info(depth, seldepth, nodes, time, hashfull, score=None, pv=None):
+    """
+    Info handler of the search (see set_info_handler in engine/search.py): one UCI info line per report.
+    """
+    line = f"info depth {depth} seldepth {seldepth}"
+    if score is not None:
+        line += f" score {uci_score(score)}"
+    line += f" nodes {nodes} nps {int(nodes / time) if time > 0 else 0} time {int(time * 1000)} hashfull {hashfull}"
+    if pv:
+        line += " pv " + " ".join(move.uci() for move in pv)
+    send(line)
+
+
+def send_bestmove(move, ponder_move=None):
+    if ponder_move:
+        send(f"bestmove {move} ponder {ponder_move}")
+    else:
+        send(f"bestmove {move}")
+    logger.debug(f"Best move sent: {move} (ponder {ponder_move})")
+
+
+def read_commands():
+    """
+    Body of the stdin reader thread: queue every line as it arrives, so commands are read while a search runs.
+    End of input counts as quit.
+    """
+    while True:
+        line = sys.stdin.readline()
+        if not line:
+            break
+        commands.put(line.strip())
+    commands.put("quit")
+
+
+def parse_time_control(tokens, board):
+    """
+    Read the clock from the arguments of a go command.
+    :return: A tuple (total_time_left, increment, using_movetime, moves_to_go) as expected by play_board
+    """
+    movetime = None
+    moves_to_go = None
+    wtime = btime = winc = binc = 0
+    for i in range(len(tokens)):
+        if tokens[i] == "movetime":
+            movetime = int(tokens[i + 1]) / 1000 
+        elif tokens[i] == "wtime":
+            wtime = int(tokens[i + 1]) / 1000
+        elif tokens[i] == "btime":
+            btime = int(tokens[i + 1]) / 1000
+        elif tokens[i] == "winc":
+            winc = int(tokens[i + 1]) / 1000
+        elif tokens[i] == "binc":
+            binc = int(tokens[i + 1]) / 1000
+        elif tokens[i] == "movestogo":
+            moves_to_go = int(tokens[i + 1])
+
+    if movetime:
+        if board.fullmove_number > 2:
+            return movetime, 0, True, None
+        return movetime//40, 0, True, None
+    if board.turn:
+        return wtime, winc, False, moves_to_go
+    return btime, binc, False, moves_to_go
+
+
+class SearchThread:
+    """
+    The one background thread every search runs on, taking its jobs from a queue. The search keeps its killer moves,
+    history table and node counters in thread-locals (SearchState in engine/search.py, CounterState in
+    utils/counters.py), so running every go on the same thread carries them over from one move to the next, where the
+    history table is aged rather than started from scratch.
+    """
+
+    def __init__(self):
+        self.jobs = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self.run, name="search", daemon=True)
+        self.thread.start()
+
+    def submit(self, job):
+        """
+        Queue a function to be called on the search thread, after the jobs queued before it.
+        """
+        self.jobs.put(job)
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            try:
+                job()
+            except Exception:
+                logger.exception("Exception on the search thread:")
+
+    def close(self):
+        """
+        Finish the queued jobs and stop the search thread.
+        """
+        self.jobs.put(None)
+        self.thread.join()
+
+
+search_thread = SearchThread()
+
+
+class SearchWorker:
+    """
+    Runs the search of a go command on the search thread, so the loop keeps reading commands while it runs:
+    isready is answered at once and stop ends the search within a few milliseconds (see poll_stop in engine/search.py).
+        go [wtime ...]: a timed search, the bestmove is sent as soon as it is done or stopped.
+        go infinite:    searches until stop.
+        go ponder:      searches on the opponent's time, on the position after the reply we expect, until the GUI tells
+                        us how the guess turned out. On ponderhit the opponent played the expected move: the search and
+                        everything it put in the transposition table are kept, and its TimeManager starts our clock.
+                        On stop it is aborted.
+    go infinite and go ponder only send their bestmove after stop or ponderhit, as the protocol requires.
+    """
+
+    def __init__(self, board, total_time_left, increment, using_movetime, moves_to_go=None, infinite=False, ponder=False):
+        self.board = board.copy()
+        self.total_time_left = total_time_left
+        self.increment = increment
+        self.using_movetime = using_movetime
+        self.moves_to_go = moves_to_go
+        self.infinite = infinite
+        self.ponder = ponder
+        self.stop_event = threading.Event()
+        self.released = threading.Event()
+        self.done = threading.Event()
+        self.time_manager = None
+        # The clock starts when the go command is received, not when the search thread gets to it
+        if ponder:
+            if total_time_left:
+                self.time_manager = TimeManager.from_clock(self.board, total_time_left, increment, using_movetime, moves_to_go, pondering=True)
+            else:
+                self.time_manager = TimeManager(5.0, pondering=True)
+        elif not infinite and total_time_left:
+            self.time_manager = TimeManager.from_clock(self.board, total_time_left, increment, using_movetime, moves_to_go)
+
+    def start(self):
+        if self.ponder:
+            logger.info(f"Pondering on {self.board.fen()}")
+        elif self.infinite:
+            logger.info(f"Infinite search on {self.board.fen()}")
+        else:
+            logger.info(f"Calculating move with time left: {self.total_time_left}, increment: {self.increment}")
+            logger.info(f"Current board position:\n{print_board_clean(self.board)}")
+        search_thread.submit(self.run)
+
+    def run(self):
+        set_stop_event(self.stop_event)
+        set_info_handler(send_info)
+        move = ponder_move = None
+        try:
+            if self.infinite or self.ponder:
+                best_move, eval, principal_variation = find_best_move(self.board, depth=INFINITE_DEPTH, time_budget=self.time_manager, return_pv=True)
+                move = best_move.uci() if best_move else None
+                if len(principal_variation) > 1:
+                    ponder_move = principal_variation[1].uci()
+                logger.info(f"{'Ponder' if self.ponder else 'Infinite'} search: {move}, eval {eval}")
+                # A search that ended on its own still has to wait for ponderhit or stop before answering
+                self.released.wait()
+            else:
+                move, ponder_move = play_board(self.board, self.total_time_left, self.increment, self.using_movetime, return_ponder=True,
+                                               moves_to_go=self.moves_to_go, time_manager=self.time_manager)
+                logger.info(f"Best move: {move}")
+        except Exception:
+            logger.exception("Exception during move calculation:")
+        send_bestmove(move or "0000", ponder_move)
+        self.done.set()
+
+    def ponderhit(self):
+        if not self.ponder or self.released.is_set():
+            return
+        self.time_manager.ponderhit()
+        logger.info(f"Ponder hit, searching for another {self.time_manager.optimum:.2f}s")
+        self.released.set()
+
+    def stop(self):
+        self.stop_event.set()
+        self.released.set()
+        self.done.wait()
+
+
+def stop_search():
+    """
+    Stop the running search if there is one and wait for its bestmove to be sent.
+    """
+    global search_worker
+    if search_worker is not None:
+        search_worker.stop()
+        search_worker = None
+
+
+def new_game():
+    """
+    Forget everything learned in the previous game: the transposition table, the pawn hash table, the evaluation
+    cache, and the killer and history tables of the search thread.
+    """
+    stop_search()
+    clear_transposition_table()
+    get_pawn_hash_table().clear()
+    get_eval_cache().clear()
+    # The search state is thread-local, so it has to be reset on the search thread itself
+    search_thread.submit(reset_search_state)
+    logger.info("New game, search tables cleared")
+
 
 def uci_loop():
+    global search_worker
     logger.playing("Starting UCI loop...")
     # logger.debug(f"printing: \nid name Obi-Pawn-Kenobot\nid author noahborch\nuciok")
     # print("id name Obi-Pawn-Kenobot")
     # print("id author noahborch")
     # print("uciok")
 
+    threading.Thread(target=read_commands, name="uci-reader", daemon=True).start()
+
     while True:
-        try:
-            line = input().strip()
-            logger.debug(f"Received command: {line}")
-        except EOFError:
-            break
+        line = commands.get()
+        logger.debug(f"Received command: {line}")
 
         if line == "uci":
-            print("id name Obi-Pawn-Kenobot")
-            print("id author noahborch")
-            print("uciok")
+            send("id name Obi-Pawn-Kenobot")
+            send("id author noahborch")
+            send(f"option name Threads type spin default {get_threads()} min 1 max 64")
+            send("option name Ponder type check default false")
+            send(f"option name Move Overhead type spin default {round(get_move_overhead() * 1000)} min 0 max 5000")
+            send("uciok")
 
         elif line == "isready":
-            print("readyok")
+            send("readyok")
+
+        elif line == "ucinewgame":
+            new_game()
+
+        elif line.startswith("setoption"):
+            # setoption name <id> [value <x>]
+            tokens = line.split()
+            if "name" in tokens and "value" in tokens:
+                name = " ".join(tokens[tokens.index("name") + 1:tokens.index("value")])
+                value = " ".join(tokens[tokens.index("value") + 1:])
+                if name.lower() == "threads":
+                    set_threads(min(64, max(1, int(value))))
+                    logger.info(f"Threads set to {get_threads()}")
+                elif name.lower() == "move overhead":
+                    set_move_overhead(int(value) / 1000)
+                    logger.info(f"Move overhead set to {get_move_overhead():.3f}s")
+                elif name.lower() == "ponder":
+                    # Only tells us the GUI may send go ponder, which is always supported
+                    logger.info(f"Ponder set to {value}")
+                else:
+                    logger.warning(f"Unknown option: {name}")
 
         elif line.startswith("position"):
             parts = line.split(" ", 2)
@@ -53,63 +360,25 @@ def uci_loop():
                         board.push_uci(move)
             # logger.info(f"Position set to:\n\n{print_board_clean(board)}")
 
+        elif line == "ponderhit":
+            if search_worker is not None:
+                search_worker.ponderhit()
+
+        elif line == "stop":
+            stop_search()
+
         elif line.startswith("go"):
+            stop_search()
             tokens = line.split()
-            movetime = None
-            wtime = btime = winc = binc = 0
-            for i in range(len(tokens)):
-                if tokens[i] == "movetime":
-                    movetime = int(tokens[i + 1]) / 1000 
-                elif tokens[i] == "wtime":
-                    wtime = int(tokens[i + 1]) / 1000
-                elif tokens[i] == "btime":
-                    btime = int(tokens[i + 1]) / 1000
-                elif tokens[i] == "winc":
-                    winc = int(tokens[i + 1]) / 1000
-                elif tokens[i] == "binc":
-                    binc = int(tokens[i + 1]) / 1000
-
-            if movetime:
-                if board.fullmove_number > 2:
-                    total_time_left = movetime
-                    using_movetime = True
-                    increment = 0
-                else:
-                    total_time_left = movetime//40
-                    increment = 0
-                    using_movetime = True
-            else:
-                using_movetime = False
-                if board.turn:
-                    total_time_left = wtime  
-                    increment = winc
-                else:
-                    total_time_left = btime
-                    increment = binc
-           
-            logger.info(f"Calculating move with time left: {total_time_left}, increment: {increment}")
-            logger.info(f"Current board position:\n{print_board_clean(board)}")
-            
-
-            try:
-                move = play_board(board, total_time_left, increment, using_movetime)
-                logger.info(f"Best move: {move}")
-                print(f"bestmove {move}")
-                logger.debug(f"Best move sent: {move}")
-                board.push_uci(move)
-                logger.info(f"New board position:\n{print_board_clean(board)}")
-                sys.stdout.flush()
-            except Exception as e:
-                import traceback
-                logger.error("Exception during move calculation:")
-                logger.error(traceback.format_exc())
-                print("bestmove 0000")  
-                sys.stdout.flush()
-
-            
-            
+            total_time_left, increment, using_movetime, moves_to_go = parse_time_control(tokens, board)
+            search_worker = SearchWorker(board, total_time_left, increment, using_movetime, moves_to_go,
+                                         infinite="infinite" in tokens, ponder="ponder" in tokens)
+            search_worker.start()
 
         elif line == "quit":
+            stop_search()
+            search_thread.close()
+            output.close()
             break
 
 if __name__ == "__main__":
@@ -0,0 +1,168 @@
+import random
+import unittest
+import chess
+import chess.polyglot
+from pathlib import Path
+import sys
+
+# Filepath shenanigans
+project_root = Path(__file__).resolve().parents[1]  # this is src/python
+sys.path.insert(0, str(project_root))
+
+from engine.board import SearchBoard, pawn_zobrist_key
+from engine.evaluation.PSTs import material_and_pst_scores, get_piece_square_tables_by_phase, PHASES
+from utils.constants import PIECE_VALUES
+from utils.game_phase import MAX_PHASE
+
+
+class TestSearchBoard(unittest.TestCase):
+    FENS = [
+        chess.STARTING_FEN,
+        "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+        "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+        "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+    ]
+
+    def test_incremental_key_matches_polyglot(self):
+        rng = random.Random(2024)
+        for fen in self.FENS:
+            for _ in range(10):
+                board = SearchBoard(fen)
+                for _ in range(60):
+                    moves = list(board.legal_moves)
+                    if not moves:
+                        break
+                    if not board.is_check() and rng.random() < 0.05:
+                        board.make_move(chess.Move.null())
+                    else:
+                        board.make_move(rng.choice(moves))
+                    self.assertEqual(board.zobrist_key, chess.polyglot.zobrist_hash(board), board.fen())
+                while board.move_stack:
+                    board.unmake_move()
+                    self.assertEqual(board.zobrist_key, chess.polyglot.zobrist_hash(board), board.fen())
+
+    def test_incremental_scores_match_scan(self):
+        rng = random.Random(2025)
+        for fen in self.FENS:
+            for _ in range(5):
+                board = SearchBoard(fen)
+                for _ in range(60):
+                    moves = list(board.legal_moves)
+                    if not moves:
+                        break
+                    board.make_move(rng.choice(moves))
+                    self.assertEqual(board.psqt_scores, material_and_pst_scores(chess.Board(board.fen())), board.fen())
+                    self.assertEqual(board.pawn_key, pawn_zobrist_key(chess.Board(board.fen())), board.fen())
+                board_copy = board.copy()
+                self.assertEqual(board_copy.psqt_scores, board.psqt_scores)
+                while board.move_stack:
+                    board.unmake_move()
+                self.assertEqual(board.psqt_scores, material_and_pst_scores(chess.Board(fen)))
+                self.assertEqual(board.pawn_key, pawn_zobrist_key(chess.Board(fen)))
+
+    def test_flat_tables_match_nested_tables(self):
+        for fen in self.FENS:
+            board = chess.Board(fen)
+            for phase, score in zip(PHASES, material_and_pst_scores(board)):
+                tables = get_piece_square_tables_by_phase(phase)
+                expected = 0
+                for square, piece in board.piece_map().items():
+                    if piece.color == chess.WHITE:
+                        expected += PIECE_VALUES[piece.piece_type] + tables[piece.piece_type][square]
+                    else:
+                        expected -= PIECE_VALUES[piece.piece_type] + tables[piece.piece_type][chess.square_mirror(square)]
+                self.assertEqual(score, expected, (fen, phase))
+
+    def test_game_phase_follows_captures_and_promotions(self):
+        board = SearchBoard()
+        self.assertEqual(board.psqt_scores[3], MAX_PHASE)
+        board = SearchBoard("4k3/1P6/8/8/8/8/8/R3K3 w - - 0 1")
+        self.assertEqual(board.psqt_scores[3], 2)
+        board.make_move(chess.Move.from_uci("b7b8q"))
+        self.assertEqual(board.psqt_scores[3], 6)
+        board.make_move(chess.Move.from_uci("e8d7"))
+        board.make_move(chess.Move.from_uci("a1a7"))
+        board.make_move(chess.Move.from_uci("d7c6"))
+        board.make_move(chess.Move.from_uci("b8b6"))
+        self.assertEqual(board.psqt_scores[3], 6)
+        board.unmake_move()
+        board.unmake_move()
+        board.unmake_move()
+        board.unmake_move()
+        board.unmake_move()
+        self.assertEqual(board.psqt_scores[3], 2)
+
+    def test_from_board_replays_history(self):
+        board = chess.Board()
+        for uci in ["e2e4", "d7d5", "e4d5", "g8f6"]:
+            board.push_uci(uci)
+        search_board = SearchBoard.from_board(board)
+        self.assertEqual(search_board.fen(), board.fen())
+        self.assertEqual(search_board.zobrist_key, chess.polyglot.zobrist_hash(board))
+        self.assertEqual(len(search_board.zobrist_history), 4)
+        self.assertEqual(search_board.zobrist_history[0], chess.polyglot.zobrist_hash(chess.Board()))
+
+    def test_copy_keeps_key(self):
+        board = SearchBoard()
+        board.make_move(chess.Move.from_uci("g1f3"))
+        board_copy = board.copy()
+        self.assertEqual(board_copy.zobrist_key, board.zobrist_key)
+        board_copy.unmake_move()
+        self.assertEqual(board_copy.zobrist_key, chess.polyglot.zobrist_hash(chess.Board()))
+
+    def shuffle_knights(self, board, times):
+        for _ in range(times):
+            for uci in ["g1f3", "g8f6", "f3g1", "f6g8"]:
+                board.make_move(chess.Move.from_uci(uci))
+
+    def test_single_repetition_inside_search_is_draw(self):
+        board = SearchBoard()
+        board.mark_search_root()
+        for uci in ["g1f3", "g8f6", "f3g1"]:
+            board.make_move(chess.Move.from_uci(uci))
+            self.assertFalse(board.is_repetition_draw())
+        board.make_move(chess.Move.from_uci("f6g8"))
+        self.assertTrue(board.is_repetition_draw())
+        self.assertFalse(board.can_claim_threefold_repetition())
+
+    def test_repetition_before_root_needs_threefold(self):
+        board = SearchBoard()
+        self.shuffle_knights(board, 1)
+        board.mark_search_root()
+        self.assertFalse(board.is_repetition_draw())
+        self.shuffle_knights(board, 1)
+        self.assertTrue(board.is_repetition_draw())
+        self.assertEqual(board.is_repetition_draw(), board.can_claim_threefold_repetition())
+
+    def test_irreversible_move_stops_scan(self):
+        board = SearchBoard()
+        board.mark_search_root()
+        board.make_move(chess.Move.from_uci("g1f3"))
+        board.make_move(chess.Move.from_uci("g8f6"))
+        board.make_move(chess.Move.from_uci("e2e4"))
+        self.assertFalse(board.is_repetition_draw())
+
+    def test_null_move_stops_scan(self):
+        board = SearchBoard()
+        board.mark_search_root()
+        board.make_move(chess.Move.from_uci("g1f3"))
+        board.make_move(chess.Move.null())
+        board.make_move(chess.Move.from_uci("f3g1"))
+        board.make_move(chess.Move.null())
+        self.assertEqual(board.zobrist_key, board.zobrist_history[0])
+        self.assertFalse(board.is_repetition_draw())
+        board.unmake_move()
+        board.unmake_move()
+        self.assertEqual(board.null_move_plies, [1])
+        board.unmake_move()
+        self.assertEqual(board.null_move_plies, [])
+
+    def test_fifty_moves(self):
+        board = SearchBoard("8/8/4k3/8/8/4K3/8/7R w - - 99 80")
+        self.assertFalse(board.is_fifty_moves_draw())
+        board.make_move(chess.Move.from_uci("h1h2"))
+        self.assertTrue(board.is_fifty_moves_draw())
+
+
+if __name__ == "__main__":
+    unittest.main()
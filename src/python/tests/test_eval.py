@@ -12,7 +12,8 @@ set_debug_config_for_module("play", False)
 set_debug_config_for_module("evaluation", False)
 set_debug_config_for_module("search", False)
 from utils.config import set_global_depth
-from engine.evaluation.evaluation import evaluate_position
+from engine.evaluation.evaluation import evaluate_position, endgame_incentives
+from engine.board import SearchBoard
 from lichess_integration.play import play_board
 from utils.log import logger, configure_logging
 from ui.terminal_prints import print_board_clean
@@ -62,6 +63,29 @@ class TestEval(unittest.TestCase):
             move = chess.Move.from_uci(move_uci)
             logger.info(f"Best response according to play_board: {board.san(move)}")
     
+    def test_mirrored_position_scores_the_same(self):
+        for fen in ["1rr3k1/5pp1/p2p3p/1pP1p3/4R3/5q2/P1PP1PPP/3R2K1 w - - 0 26",
+                    "r1bqkb1r/pppppppp/2n2n2/8/2B1P3/5Q2/PPPP1PPP/RNB1K1NR b KQkq - 4 3",
+                    "8/5pk1/6p1/3R4/8/6P1/5PK1/8 w - - 0 40"]:
+            board = chess.Board(fen)
+            self.assertEqual(evaluate_position(board), evaluate_position(board.mirror()))
+
+    def test_search_board_scores_like_plain_board(self):
+        board = chess.Board("1rr3k1/5pp1/p2p3p/1pP1p3/4R3/5q2/P1PP1PPP/3R2K1 w - - 0 26")
+        search_board = SearchBoard.from_board(board)
+        for uci in ["e4e5", "f3d1", "e5e1", "d1e1"]:
+            board.push_uci(uci)
+            search_board.make_move(chess.Move.from_uci(uci))
+            self.assertEqual(evaluate_position(search_board), evaluate_position(board))
+
+    def test_king_proximity_rewards_the_side_ahead(self):
+        near = chess.Board("k7/8/1K6/8/8/8/8/7R w - - 0 60")
+        far = chess.Board("k7/8/8/8/8/5K2/8/7R w - - 0 60")
+        self.assertGreater(endgame_incentives(near, 500), endgame_incentives(far, 500))
+        self.assertGreater(endgame_incentives(far, 500), 0)
+        self.assertEqual(endgame_incentives(near, -500), -endgame_incentives(near, 500))
+        self.assertEqual(endgame_incentives(near, 0), 0)
+
     def test_FEN_1(self):
         fen = "1rr3k1/5pp1/p2p3p/1pP1p3/4R3/5q2/P1PP1PPP/3R2K1 w - - 0 26"
         iterations = 4
@@ -0,0 +1,63 @@
+import unittest
+import chess
+from pathlib import Path
+import sys
+
+# Filepath shenanigans
+project_root = Path(__file__).resolve().parents[1]  # this is src/python
+sys.path.insert(0, str(project_root))
+
+from utils.debug_config import set_debug_config_for_module
+set_debug_config_for_module("evaluation", False)
+from engine.evaluation.eval_cache import EvalCache, get_eval_cache
+from engine.evaluation.evaluation import evaluate_position
+from engine.board import SearchBoard
+from utils.config import set_eval_cache_entries, get_eval_cache_entries
+
+
+class TestEvalCache(unittest.TestCase):
+    def test_store_and_probe(self):
+        cache = EvalCache(16)
+        self.assertIsNone(cache.probe(5))
+        cache.store(5, 42)
+        self.assertEqual(cache.probe(5), 42)
+        # Same slot, other key: the old entry is replaced
+        cache.store(21, -7)
+        self.assertIsNone(cache.probe(5))
+        self.assertEqual(cache.probe(21), -7)
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+
+    def test_evaluate_position_uses_cache(self):
+        board = SearchBoard("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 20")
+        cache = get_eval_cache()
+        cache.clear()
+        score = evaluate_position(board, check_outcome=False)
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+        self.assertEqual(evaluate_position(board, check_outcome=False), score)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(score, evaluate_position(chess.Board(board.fen()), check_outcome=False))
+
+    def test_opening_positions_are_kept_apart(self):
+        cache = get_eval_cache()
+        cache.clear()
+        # The opening and midgame tables score this position differently
+        fen = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 {}"
+        scores = []
+        for fullmove_number in (1, 30):
+            board = SearchBoard(fen.format(fullmove_number))
+            scores.append(evaluate_position(board, check_outcome=False))
+            self.assertEqual(scores[-1], evaluate_position(chess.Board(board.fen()), check_outcome=False))
+        self.assertNotEqual(scores[0], scores[1])
+        self.assertEqual(cache.hits, 0)
+
+    def test_size_is_configurable(self):
+        entries = get_eval_cache_entries()
+        try:
+            set_eval_cache_entries(1000)
+            self.assertEqual(len(get_eval_cache().entries), 1000)
+        finally:
+            set_eval_cache_entries(entries)
+
+
+if __name__ == "__main__":
+    unittest.main()
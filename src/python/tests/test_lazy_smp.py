@@ -0,0 +1,140 @@
+import threading
+import time
+import unittest
+import chess
+import chess.polyglot
+from pathlib import Path
+import sys
+
+# Filepath shenanigans
+project_root = Path(__file__).resolve().parents[1]  # this is src/python
+sys.path.insert(0, str(project_root))
+
+from utils.debug_config import set_debug_config_for_module
+set_debug_config_for_module("search", False)
+set_debug_config_for_module("play", False)
+from engine.search import find_best_move, set_stop_event
+from unittest import mock
+import engine.lazy_smp as lazy_smp
+from engine.lazy_smp import shutdown_lazy_smp
+import engine.root_split as root_split
+from engine.root_split import shutdown_root_split
+from engine.transposition_table import TranspositionTable, table_size_bytes, BOUND_EXACT
+from utils.config import set_threads, set_search_backend, set_qDepth_removed
+
+
+class TestSharedTranspositionTable(unittest.TestCase):
+    def test_tables_on_one_buffer_share_entries(self):
+        buffer = bytearray(table_size_bytes(1))
+        writer = TranspositionTable(1, buffer)
+        reader = TranspositionTable(1, buffer)
+        move = chess.Move.from_uci("e2e4")
+        writer.store(12345, 4, BOUND_EXACT, 17, move)
+        self.assertEqual(reader.probe(12345), (4, BOUND_EXACT, 17, move))
+
+    def test_torn_entry_reads_as_miss(self):
+        table = TranspositionTable(1)
+        table.store(12345, 4, BOUND_EXACT, 17, chess.Move.from_uci("e2e4"))
+        index = (12345 % table.num_buckets) * 2
+        # Another process overwrote the data word but not yet the key word
+        table.data[index] ^= 1 << 40
+        self.assertIsNone(table.probe(12345))
+
+
+class TestLazySMP(unittest.TestCase):
+    def tearDown(self):
+        set_threads(1)
+        shutdown_lazy_smp()
+
+    def test_multi_process_search_returns_legal_move(self):
+        set_threads(3)
+        board = chess.Board("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1")
+        for _ in range(2):
+            best_move, _, principal_variation = find_best_move(board, depth=3, return_pv=True)
+            self.assertIn(best_move, board.legal_moves)
+            self.assertEqual(principal_variation[0], best_move)
+
+    def test_helpers_that_do_not_stop_are_replaced(self):
+        set_threads(3)
+        board = chess.Board("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1")
+        # No helper can answer within no time at all, so every one of them counts as stuck
+        with mock.patch.object(lazy_smp, "HELPER_STOP_TIMEOUT", 0):
+            best_move, _ = find_best_move(board, depth=2)
+        self.assertIn(best_move, board.legal_moves)
+        self.assertIsNone(lazy_smp.executor)
+        best_move, _ = find_best_move(board, depth=2)
+        self.assertIn(best_move, board.legal_moves)
+        self.assertIsNotNone(lazy_smp.executor)
+
+
+class TestRootSplit(unittest.TestCase):
+    def tearDown(self):
+        set_threads(1)
+        set_search_backend("auto")
+        shutdown_root_split()
+        shutdown_lazy_smp()
+
+    def test_fixed_depth_result_is_reproducible(self):
+        set_search_backend("root_split")
+        board = chess.Board("r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3")
+        results = []
+        for threads in (2, 3, 2):
+            set_threads(threads)
+            results.append(find_best_move(board, depth=3, return_pv=True))
+        self.assertIn(results[0][0], board.legal_moves)
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0], results[2])
+
+    def test_finds_mate_in_one(self):
+        set_search_backend("root_split")
+        set_threads(2)
+        board = chess.Board("6k1/5ppp/8/8/8/8/8/3Q2K1 w - - 0 1")
+        self.assertEqual(find_best_move(board, depth=2)[0], chess.Move.from_uci("d1d8"))
+
+    def test_settings_changed_after_start_reach_workers(self):
+        set_search_backend("root_split")
+        set_threads(2)
+        # Without the quiescence search Qxe5 looks like it wins a pawn, the recapture is never seen
+        board = chess.Board("4k3/8/3p4/4p3/8/8/8/4QK2 w - - 0 1")
+        with_quiescence = find_best_move(board, depth=1)
+        try:
+            set_qDepth_removed(True)
+            on_running_pool = find_best_move(board, depth=1)
+            shutdown_root_split()
+            on_new_pool = find_best_move(board, depth=1)
+        finally:
+            set_qDepth_removed(False)
+        self.assertNotEqual(on_new_pool, with_quiescence)
+        self.assertEqual(on_running_pool, on_new_pool)
+
+
+    def test_timed_search_uses_another_backend(self):
+        set_search_backend("root_split")
+        set_threads(2)
+        board = chess.Board("r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3")
+        best_move, _ = find_best_move(board, depth=20, time_budget=0.5)
+        self.assertIn(best_move, board.legal_moves)
+        self.assertIsNone(root_split.executor)
+
+    def test_stop_event_stops_workers(self):
+        set_search_backend("root_split")
+        set_threads(2)
+        board = chess.Board("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1")
+        find_best_move(board, depth=1)
+        event = threading.Event()
+        timer = threading.Timer(0.5, event.set)
+        set_stop_event(event)
+        try:
+            timer.start()
+            start = time.perf_counter()
+            best_move, _ = find_best_move(board, depth=20)
+            elapsed = time.perf_counter() - start
+        finally:
+            timer.cancel()
+            set_stop_event(None)
+        self.assertIn(best_move, board.legal_moves)
+        self.assertLess(elapsed, 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
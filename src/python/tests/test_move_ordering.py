@@ -0,0 +1,93 @@
+import unittest
+import chess
+from pathlib import Path
+import sys
+
+# Filepath shenanigans
+project_root = Path(__file__).resolve().parents[1]  # this is src/python
+sys.path.insert(0, str(project_root))
+
+from engine.move_ordering import pick_moves
+from engine.evaluation.see import static_exchange_evaluation
+
+
+class TestMovePicker(unittest.TestCase):
+    FENS = [
+        chess.STARTING_FEN,
+        "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+        "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+        "8/8/8/2k5/2pP4/8/B7/4K3 b - d3 0 3",
+        "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+    ]
+
+    def test_yields_every_legal_move_once(self):
+        for fen in self.FENS:
+            board = chess.Board(fen)
+            picked = list(pick_moves(board))
+            self.assertEqual(len(picked), len(set(picked)), fen)
+            self.assertEqual(set(picked), set(board.legal_moves), fen)
+
+    def test_tt_move_and_killers_come_first(self):
+        board = chess.Board(self.FENS[1])
+        tt_move = chess.Move.from_uci("a2a3")
+        killer = chess.Move.from_uci("g2g3")
+        picked = list(pick_moves(board, tt_move=tt_move, killers=(killer, None)))
+        self.assertEqual(picked[0], tt_move)
+        self.assertEqual(picked.count(tt_move), 1)
+        self.assertEqual(picked.count(killer), 1)
+        first_quiet = next(i for i, move in enumerate(picked[1:], 1) if not board.is_capture(move))
+        self.assertEqual(picked[first_quiet], killer)
+
+    def test_illegal_tt_move_is_ignored(self):
+        board = chess.Board()
+        picked = list(pick_moves(board, tt_move=chess.Move.from_uci("e2e5")))
+        self.assertEqual(set(picked), set(board.legal_moves))
+
+    def test_captures_ordered_before_quiets(self):
+        board = chess.Board(self.FENS[1])
+        picked = list(pick_moves(board))
+        self.assertTrue(board.is_capture(picked[0]))
+
+    def test_quiescence_only_tactical_moves(self):
+        board = chess.Board(self.FENS[1])
+        for move in pick_moves(board, quiescence=True):
+            self.assertTrue(board.is_capture(move) or move.promotion or board.gives_check(move))
+
+    def test_quiescence_without_quiet_checks(self):
+        board = chess.Board(self.FENS[1])
+        for move in pick_moves(board, quiescence=True, quiet_checks=False):
+            self.assertTrue(board.is_capture(move) or move.promotion)
+
+    def test_quiescence_skips_losing_captures(self):
+        # Qxd5 wins a pawn for the queen
+        board = chess.Board("4k3/8/2p5/3p4/8/8/3Q4/4K3 w - - 0 1")
+        self.assertNotIn(chess.Move.from_uci("d2d5"), list(pick_moves(board, quiescence=True)))
+        self.assertEqual(list(pick_moves(board))[-1], chess.Move.from_uci("d2d5"))
+
+
+class TestStaticExchangeEvaluation(unittest.TestCase):
+    def see(self, fen, uci):
+        return static_exchange_evaluation(chess.Board(fen), chess.Move.from_uci(uci))
+
+    def test_undefended_piece(self):
+        self.assertEqual(self.see("4k3/8/8/3r4/8/8/8/3RK3 w - - 0 1", "d1d5"), 500)
+
+    def test_defended_pawn_costs_the_queen(self):
+        self.assertEqual(self.see("4k3/8/2p5/3p4/8/8/3Q4/4K3 w - - 0 1", "d2d5"), 100 - 900)
+
+    def test_even_trade(self):
+        self.assertEqual(self.see("4k3/8/2p5/3n4/8/4N3/8/4K3 w - - 0 1", "e3d5"), 0)
+
+    def test_xray_attacker_behind_rook(self):
+        # The queen behind the rook backs up the capture on d5, so RxN, PxR, QxP nets a minor for the exchange
+        self.assertEqual(self.see("4k3/8/2p5/3n4/8/8/3R4/3QK3 w - - 0 1", "d2d5"), 300 - 500 + 100)
+
+    def test_king_cannot_recapture_defended_square(self):
+        self.assertEqual(self.see("8/8/8/3pk3/8/8/3R4/3RK3 w - - 0 1", "d2d5"), 100)
+
+    def test_en_passant(self):
+        self.assertEqual(self.see("4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1", "e5d6"), 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import chess
+from pathlib import Path
+import sys
+
+# Filepath shenanigans
+project_root = Path(__file__).resolve().parents[1]  # this is src/python
+sys.path.insert(0, str(project_root))
+
+from engine.evaluation.pawn_structure import (evaluate_pawn_structure, evaluate_pawns_of_color, PawnHashTable, ISOLATED_PAWN_PENALTY,
+                                              DOUBLED_PAWN_PENALTY, BACKWARD_PAWN_PENALTY, PAWN_ISLAND_PENALTY,
+                                              PAWN_CHAIN_BASE_BONUS, PAWN_CHAIN_HEAD_BONUS)
+from engine.board import pawn_zobrist_key
+
+
+def pawn_scores(fen):
+    board = chess.Board(fen)
+    return evaluate_pawn_structure(board.pawns & board.occupied_co[chess.WHITE], board.pawns & board.occupied_co[chess.BLACK])
+
+
+def squares(*names):
+    return sum(chess.BB_SQUARES[chess.parse_square(name)] for name in names)
+
+
+class TestPawnStructure(unittest.TestCase):
+    def test_symmetric_structures_score_zero(self):
+        self.assertEqual(pawn_scores(chess.STARTING_FEN), (0, 0))
+        self.assertEqual(pawn_scores("4k3/pp3ppp/2p5/3p4/3P4/2P5/PP3PPP/4K3 w - - 0 1"), (0, 0))
+
+    def test_mirrored_structure_scores_opposite(self):
+        for fen in ["4k3/pp4p1/8/2Pp4/8/1P5P/P7/4K3 w - - 0 1", "4k3/8/2p5/8/8/P2P4/1P6/4K3 w - - 0 1"]:
+            board = chess.Board(fen).mirror()
+            midgame, endgame = pawn_scores(fen)
+            self.assertEqual(pawn_scores(board.fen()), (-midgame, -endgame))
+
+    def test_structure_terms(self):
+        # Black pawns on every file of the seventh rank, so no white pawn is passed
+        blockers = chess.BB_RANK_7
+        self.assertEqual(evaluate_pawns_of_color(chess.WHITE, squares("a2", "a3"), blockers),
+                         (2 * ISOLATED_PAWN_PENALTY + DOUBLED_PAWN_PENALTY + PAWN_ISLAND_PENALTY,) * 2)
+        self.assertEqual(evaluate_pawns_of_color(chess.WHITE, squares("a2", "c2", "e2"), blockers),
+                         (3 * (ISOLATED_PAWN_PENALTY + PAWN_ISLAND_PENALTY),) * 2)
+        self.assertEqual(evaluate_pawns_of_color(chess.WHITE, squares("b2", "c3", "d4"), blockers),
+                         (2 * PAWN_CHAIN_BASE_BONUS + PAWN_CHAIN_HEAD_BONUS + PAWN_ISLAND_PENALTY,) * 2)
+        # c2 cannot be protected by the b4 pawn any more, and black d4 holds its stop square
+        self.assertEqual(evaluate_pawns_of_color(chess.WHITE, squares("b4", "c2"), blockers | squares("d4")),
+                         (BACKWARD_PAWN_PENALTY + PAWN_ISLAND_PENALTY,) * 2)
+        self.assertEqual(evaluate_pawns_of_color(chess.WHITE, squares("b2", "c2"), blockers | squares("d4")),
+                         (PAWN_ISLAND_PENALTY,) * 2)
+
+    def test_protected_passer_beats_lone_passer(self):
+        lone = pawn_scores("4k3/8/8/3P4/8/8/6P1/4K3 w - - 0 1")
+        protected = pawn_scores("4k3/8/8/3P4/2P5/8/8/4K3 w - - 0 1")
+        self.assertGreater(protected[1], lone[1])
+
+    def test_hash_table_counts_hits(self):
+        table = PawnHashTable(1024)
+        board = chess.Board()
+        white_pawns = board.pawns & board.occupied_co[chess.WHITE]
+        black_pawns = board.pawns & board.occupied_co[chess.BLACK]
+        key = pawn_zobrist_key(board)
+        self.assertEqual(table.scores(key, white_pawns, black_pawns), (0, 0))
+        board.push_uci("g1f3")
+        self.assertEqual(pawn_zobrist_key(board), key)
+        self.assertEqual(table.scores(key, white_pawns, black_pawns), (0, 0))
+        self.assertEqual((table.hits, table.probes), (1, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
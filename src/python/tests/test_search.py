@@ -12,7 +12,13 @@ sys.path.insert(0, str(project_root))
 from utils.debug_config import get_debug_config, set_debug_config_for_module, set_no_debug
 set_debug_config_for_module("search", False)
 set_debug_config_for_module("play", False)
-from engine.search import find_best_move
+import threading
+from unittest import mock
+import engine.search as search
+from engine.search import find_best_move, negamax_alpha_beta, quiescence_search, set_stop_event, set_info_handler
+from engine.search import state, reset_search_state, age_history_table, iterative_deepening
+from engine.board import SearchBoard
+from engine.transposition_table import get_transposition_table, BOUND_LOWER
 from main import set_global_depth
 from ui.terminal_prints import print_board_clean
 from utils.log import logger, configure_logging
@@ -36,6 +42,95 @@ class TestSearch(unittest.TestCase):
         self.assertEqual(best_move.uci(), "d1d8")
         self.assertGreaterEqual(eval_score, CHECKMATE_BASE_SCORE) 
 
+    def test_terminal_positions_found_by_move_loop(self):
+        stalemate = SearchBoard("7k/5Q2/6K1/8/8/8/8/8 b - - 0 1")
+        self.assertEqual(negamax_alpha_beta(stalemate, 2), 0)
+        mated = SearchBoard("6k1/5ppp/8/8/8/8/5PPP/3Q2KR w - - 0 1")
+        mated.make_move(chess.Move.from_uci("d1d8"))
+        self.assertLessEqual(negamax_alpha_beta(mated, 2), -CHECKMATE_BASE_SCORE)
+        self.assertLessEqual(quiescence_search(mated, 4, -float('inf'), float('inf'), 1), -CHECKMATE_BASE_SCORE)
+
+    def test_internal_iterative_deepening_feeds_singular_extension(self):
+        # A PV node at singular depth with an empty table: IID finds the TT move, which the singular check then reads
+        get_transposition_table().clear()
+        board = SearchBoard("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1")
+        score = negamax_alpha_beta(board, 6, -10**9, 10**9, ply=1)
+        self.assertLess(abs(score), CHECKMATE_BASE_SCORE)
+        self.assertEqual(board.fen(), "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1")
+
+    def test_principal_variation_followed_after_singular_check(self):
+        # A node on the previous PV with a TT move deep enough for the singular check. Its excluded search must not
+        # stop the real search from following the PV into the child
+        get_transposition_table().clear()
+        reset_search_state()
+        root = chess.Board("r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3")
+        principal_variation = [chess.Move.from_uci(uci) for uci in ("f1b5", "g8f6", "e1g1", "f6e4")]
+        board = SearchBoard.from_board(root)
+        board.make_move(principal_variation[0])
+        get_transposition_table().store(board.zobrist_key, 4, BOUND_LOWER, 0, principal_variation[1])
+        child = board.copy()
+        child.push(principal_variation[1])
+        first_moves = []
+        pick_moves = search.pick_moves
+
+        def recording_pick_moves(board, tt_move=None, **kwargs):
+            if board.fen() == child.fen():
+                first_moves.append(tt_move)
+            return pick_moves(board, tt_move=tt_move, **kwargs)
+
+        search.state.previous_pv = principal_variation
+        search.state.following_pv = True
+        with mock.patch.object(search, "pick_moves", recording_pick_moves):
+            negamax_alpha_beta(board, 6, -10**9, 10**9, ply=1)
+        self.assertEqual(first_moves[0], principal_variation[2])
+
+    def test_root_window_gives_bounds(self):
+        board = chess.Board("r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3")
+        root_moves = [chess.Move.from_uci("b1c3")]
+        get_transposition_table().clear()
+        _, exact, _, _ = iterative_deepening(board, 4, root_moves=root_moves)
+        get_transposition_table().clear()
+        _, lower_bound, _, completed_depth = iterative_deepening(board, 4, root_moves=root_moves, root_alpha=exact - 51, root_beta=exact - 50)
+        self.assertEqual(completed_depth, 4)
+        self.assertGreaterEqual(lower_bound, exact - 50)
+        get_transposition_table().clear()
+        _, upper_bound, _, _ = iterative_deepening(board, 4, root_moves=root_moves, root_alpha=exact + 50, root_beta=exact + 51)
+        self.assertLessEqual(upper_bound, exact + 50)
+
+    def test_principal_variation_is_legal_line(self):
+        board = chess.Board("r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3")
+        best_move, _, principal_variation = find_best_move(board, depth=4, return_pv=True)
+        self.assertEqual(principal_variation[0], best_move)
+        self.assertGreater(len(principal_variation), 1)
+        for move in principal_variation:
+            self.assertIn(move, board.legal_moves)
+            board.push(move)
+
+    def test_stopped_search_still_returns_move(self):
+        board = chess.Board("r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3")
+        stop = threading.Event()
+        stop.set()
+        set_stop_event(stop)
+        try:
+            best_move, _, principal_variation = find_best_move(board, depth=20, return_pv=True)
+        finally:
+            set_stop_event(None)
+        self.assertIn(best_move, board.legal_moves)
+        self.assertEqual(principal_variation, [best_move])
+
+    def test_info_reported_after_every_iteration(self):
+        board = chess.Board("r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3")
+        reports = []
+        set_info_handler(lambda **info: reports.append(info))
+        try:
+            best_move, _, principal_variation = find_best_move(board, depth=4, return_pv=True)
+        finally:
+            set_info_handler(None)
+        completed = [info for info in reports if info["pv"]]
+        self.assertEqual([info["depth"] for info in completed], [1, 2, 3, 4])
+        self.assertEqual(completed[-1]["pv"], principal_variation)
+        self.assertTrue(all(info["nodes"] > 0 and info["seldepth"] >= 1 for info in completed))
+
     def test_epd_10_positions_depth6_time10(self):
         self.run_epd_test_suite(file_name="EPD_tests.txt", depth=10, max_lines=10, time_budget=10)
 
@@ -158,6 +253,43 @@ class TestSearch(unittest.TestCase):
                 logger.error(f"💥 Failed to save log: {e}")
 
 
+class TestQuietMoveTables(unittest.TestCase):
+    # A window far below any real score, wide enough for a PV node: the first move searched fails high
+    ALPHA = -10**6
+    BETA = -10**6 + 2
+
+    def setUp(self):
+        get_transposition_table().clear()
+        reset_search_state()
+
+    def test_quiet_cutoff_fills_killers_and_history(self):
+        board = SearchBoard("4k3/8/8/8/8/8/8/R3K3 w - - 0 1")
+        negamax_alpha_beta(board, 1, self.ALPHA, self.BETA, ply=3)
+        killer = state.killer_moves[3][0]
+        self.assertIsNotNone(killer)
+        self.assertFalse(board.is_capture(killer))
+        self.assertEqual(state.history_table[killer.from_square * 64 + killer.to_square], 1)
+        self.assertTrue(all(killers == [None, None] for ply, killers in enumerate(state.killer_moves) if ply != 3))
+
+    def test_capture_cutoff_leaves_tables_alone(self):
+        board = SearchBoard("4k3/8/8/8/8/8/q7/R3K3 w - - 0 1")
+        negamax_alpha_beta(board, 1, self.ALPHA, self.BETA, ply=3)
+        self.assertTrue(all(killers == [None, None] for killers in state.killer_moves))
+        self.assertFalse(any(state.history_table))
+
+    def test_history_is_halved_between_searches(self):
+        board = chess.Board("r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3")
+        find_best_move(board, depth=4)
+        before = list(state.history_table)
+        self.assertTrue(any(score > 1 for score in before))
+        age_history_table()
+        self.assertEqual(state.history_table, [score >> 1 for score in before])
+        # The next search ages it once more before it starts, and only adds to it afterwards
+        state.history_table[:] = before
+        find_best_move(board, depth=4)
+        self.assertTrue(all(after >= score >> 1 for after, score in zip(state.history_table, before)))
+
+
 if __name__ == "__main__":  
     suite = unittest.TestSuite()
     suite.addTest(TestSearch("test_epd_10_positions_depth6_time10"))
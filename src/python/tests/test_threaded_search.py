@@ -0,0 +1,68 @@
+import unittest
+from unittest import mock
+import threading
+import chess
+from pathlib import Path
+import sys
+
+# Filepath shenanigans
+project_root = Path(__file__).resolve().parents[1]  # this is src/python
+sys.path.insert(0, str(project_root))
+
+from utils.debug_config import set_debug_config_for_module
+set_debug_config_for_module("search", False)
+set_debug_config_for_module("play", False)
+import engine.search as search
+import engine.threaded_search as threaded_search
+from engine.search import find_best_move
+from utils.config import set_threads, set_search_backend
+from utils.counters import counters
+
+
+class TestSearchState(unittest.TestCase):
+    def test_tables_are_per_thread(self):
+        move = chess.Move.from_uci("e2e4")
+        search.update_quiet_move_tables(move, 4, 3)
+        seen_by_thread = []
+
+        def other_thread():
+            seen_by_thread.append((search.state.killer_moves[3][0], search.state.history_table[move.from_square * 64 + move.to_square],
+                                   counters.total_positions_evaluated))
+
+        thread = threading.Thread(target=other_thread)
+        thread.start()
+        thread.join()
+        self.assertEqual(search.state.killer_moves[3][0], move)
+        self.assertEqual(seen_by_thread, [(None, 0, 0)])
+
+
+class TestThreadedSearch(unittest.TestCase):
+    FEN = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+
+    def tearDown(self):
+        set_threads(1)
+        set_search_backend("auto")
+
+    def test_threaded_search_returns_legal_move(self):
+        set_threads(3)
+        set_search_backend("thread")
+        board = chess.Board(self.FEN)
+        # Run the helper threads even on a build with the GIL, where they would normally be skipped
+        with mock.patch.object(threaded_search, "gil_enabled", return_value=False):
+            best_move, _, principal_variation = find_best_move(board, depth=3, return_pv=True)
+        self.assertIn(best_move, board.legal_moves)
+        self.assertEqual(principal_variation[0], best_move)
+        self.assertEqual(board.fen(), self.FEN)
+
+    def test_gil_build_falls_back_to_one_thread(self):
+        set_threads(3)
+        set_search_backend("thread")
+        with mock.patch.object(threaded_search, "gil_enabled", return_value=True), \
+                mock.patch.object(threading.Thread, "start") as start:
+            best_move, _ = find_best_move(chess.Board(self.FEN), depth=2)
+        start.assert_not_called()
+        self.assertIsNotNone(best_move)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+import time
+import chess
+from pathlib import Path
+import sys
+
+# Filepath shenanigans
+project_root = Path(__file__).resolve().parents[1]  # this is src/python
+sys.path.insert(0, str(project_root))
+
+from utils.debug_config import set_debug_config_for_module
+set_debug_config_for_module("search", False)
+set_debug_config_for_module("play", False)
+from engine.search import find_best_move
+from lichess_integration.play import play_board
+from engine.time_manager import TimeManager, MAX_CLOCK_SHARE
+from utils.config import get_move_overhead
+
+
+class TestTimeManager(unittest.TestCase):
+    def test_limits_from_clock(self):
+        board = chess.Board()
+        time_manager = TimeManager.from_clock(board, 60, 1)
+        self.assertLess(time_manager.optimum, time_manager.maximum)
+        self.assertLessEqual(time_manager.maximum, (60 - get_move_overhead()) * MAX_CLOCK_SHARE)
+        movetime = TimeManager.from_clock(board, 2, using_movetime=True)
+        self.assertAlmostEqual(movetime.maximum, 2 - get_move_overhead())
+
+    def test_unstable_best_move_gets_more_time(self):
+        stable = TimeManager(1.0, 3.0)
+        unstable = TimeManager(1.0, 3.0)
+        for move in ("e2e4", "e2e4", "e2e4"):
+            stable.update(chess.Move.from_uci(move), 20)
+        for move in ("e2e4", "d2d4", "e2e4"):
+            unstable.update(chess.Move.from_uci(move), 20)
+        self.assertGreater(unstable.target_time(), stable.target_time())
+        self.assertLessEqual(unstable.target_time(), 3.0)
+
+    def test_no_limits_while_pondering(self):
+        time_manager = TimeManager(0.0, 0.0, pondering=True)
+        self.assertFalse(time_manager.hard_limit_reached())
+        self.assertFalse(time_manager.should_stop_iteration())
+        time_manager.ponderhit()
+        self.assertTrue(time_manager.hard_limit_reached())
+
+    def test_single_legal_move_is_played_at_once(self):
+        board = chess.Board("k7/8/8/8/8/8/1R6/7K b - - 0 1")
+        start_time = time.perf_counter()
+        best_move, _ = find_best_move(board, depth=20, time_budget=TimeManager(30.0))
+        self.assertEqual(best_move, chess.Move.from_uci("a8a7"))
+        self.assertLess(time.perf_counter() - start_time, 5)
+
+    def test_hard_limit_stops_inside_iteration(self):
+        board = chess.Board("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1")
+        start_time = time.perf_counter()
+        best_move, _ = find_best_move(board, depth=30, time_budget=TimeManager(0.3, 0.5))
+        self.assertIn(best_move, board.legal_moves)
+        self.assertLess(time.perf_counter() - start_time, 1.5)
+
+
+    def test_clock_runs_from_go_command(self):
+        board = chess.Board("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1")
+        # Built when the go command arrived, a second before the search thread got to it
+        time_manager = TimeManager(1.0, 1.5)
+        time.sleep(1.0)
+        start_time = time.perf_counter()
+        move = play_board(board, time_manager=time_manager)
+        self.assertIn(chess.Move.from_uci(move), board.legal_moves)
+        self.assertLess(time.perf_counter() - start_time, 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+import chess
+import chess.polyglot
+from pathlib import Path
+import sys
+
+# Filepath shenanigans
+project_root = Path(__file__).resolve().parents[1]  # this is src/python
+sys.path.insert(0, str(project_root))
+
+from engine.transposition_table import TranspositionTable, score_to_tt, score_from_tt, BOUND_EXACT, BOUND_LOWER, BOUND_UPPER
+from utils.constants import CHECKMATE_BASE_SCORE
+
+
+class TestTranspositionTable(unittest.TestCase):
+    def setUp(self):
+        self.table = TranspositionTable(1)
+        self.table.new_search()
+
+    def test_store_and_probe(self):
+        board = chess.Board()
+        key = chess.polyglot.zobrist_hash(board)
+        move = chess.Move.from_uci("e2e4")
+        self.table.store(key, 5, BOUND_EXACT, -37, move)
+        self.assertEqual(self.table.probe(key), (5, BOUND_EXACT, -37, move))
+        self.assertIsNone(self.table.probe(key ^ 1))
+
+    def test_promotion_move_round_trip(self):
+        move = chess.Move.from_uci("a7a8n")
+        self.table.store(1234, 1, BOUND_LOWER, 250, move)
+        self.assertEqual(self.table.probe(1234)[3], move)
+
+    def test_depth_preferred_slot_survives_shallow_stores(self):
+        buckets = self.table.num_buckets
+        deep_key, shallow_key, newer_key = 7, 7 + buckets, 7 + 2 * buckets
+        self.table.store(deep_key, 8, BOUND_EXACT, 10, None)
+        self.table.store(shallow_key, 1, BOUND_UPPER, 20, None)
+        self.table.store(newer_key, 2, BOUND_LOWER, 30, None)
+        self.assertEqual(self.table.probe(deep_key)[0], 8)
+        self.assertIsNone(self.table.probe(shallow_key))
+        self.assertEqual(self.table.probe(newer_key)[2], 30)
+
+    def test_keeps_move_when_new_result_has_none(self):
+        move = chess.Move.from_uci("g1f3")
+        self.table.store(99, 3, BOUND_LOWER, 5, move)
+        self.table.store(99, 4, BOUND_UPPER, 1, None)
+        self.assertEqual(self.table.probe(99)[3], move)
+
+    def test_mate_scores_are_ply_independent(self):
+        mate_in_three_from_root = CHECKMATE_BASE_SCORE + 100 - 5
+        stored = score_to_tt(mate_in_three_from_root, 2)
+        self.assertEqual(score_from_tt(stored, 2), mate_in_three_from_root)
+        self.assertEqual(score_from_tt(stored, 4), mate_in_three_from_root - 2)
+        self.assertEqual(score_from_tt(score_to_tt(-mate_in_three_from_root, 2), 4), -mate_in_three_from_root + 2)
+        self.assertEqual(score_to_tt(123, 7), 123)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+import os
+import queue
+import signal
+import subprocess
+import threading
+from pathlib import Path
+import sys
+
+# Filepath shenanigans
+project_root = Path(__file__).resolve().parents[1]  # this is src/python
+sys.path.insert(0, str(project_root))
+
+
+class TestUCI(unittest.TestCase):
+    """
+    Talks to the engine over UCI, as a GUI would: a separate process reading commands from its stdin.
+    """
+
+    # Seconds to wait for an answer, far more than any of these searches takes
+    TIMEOUT = 30
+
+    def setUp(self):
+        self.engine = subprocess.Popen([sys.executable, "-u", str(project_root / "lichess_integration" / "uci_communication.py")],
+                                       cwd=project_root, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                       stderr=subprocess.DEVNULL, text=True, start_new_session=True)
+        self.lines = queue.Queue()
+        self.reader = threading.Thread(target=self.read_lines, daemon=True)
+        self.reader.start()
+
+    def tearDown(self):
+        # Kill the helper processes of the engine as well, which keep its stdout open
+        try:
+            os.killpg(self.engine.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        self.engine.wait()
+        self.reader.join()
+        self.engine.stdin.close()
+        self.engine.stdout.close()
+
+    def read_lines(self):
+        for line in self.engine.stdout:
+            self.lines.put(line.strip())
+
+    def send(self, *commands):
+        for command in commands:
+            self.engine.stdin.write(command + "\n")
+        self.engine.stdin.flush()
+
+    def wait_for(self, prefix):
+        """
+        Read lines until one starts with prefix, and return it.
+        """
+        while True:
+            try:
+                line = self.lines.get(timeout=self.TIMEOUT)
+            except queue.Empty:
+                self.fail(f"No {prefix} from the engine within {self.TIMEOUT}s")
+            if line.startswith(prefix):
+                return line
+
+    def test_timed_and_stopped_searches_with_two_threads(self):
+        self.send("uci", "setoption name Threads value 2", "isready")
+        self.wait_for("readyok")
+        self.send("position startpos", "go wtime 3000 btime 3000")
+        self.assertEqual(len(self.wait_for("bestmove").split()[1]), 4)
+        self.send("position startpos moves e2e4", "go infinite")
+        self.wait_for("info depth 2")
+        self.send("stop")
+        self.assertEqual(len(self.wait_for("bestmove").split()[1]), 4)
+        self.send("quit")
+        self.assertEqual(self.engine.wait(timeout=self.TIMEOUT), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,39 @@
 depth = 3
 iterative_depth = 3
 iterative_deepening = True
-qDepth = depth // 2 + 2
-qDepth_restricted = False
+qDepth = 8  # quiescence plies when restricted; check, recapture and singular extensions resolve the longer tactics
+qDepth_restricted = True
 qDepth_removed = False
+tt_size_mb = 64
+pawn_hash_entries = 16384  # slots of the pawn structure hash table
+eval_cache_entries = 65536  # slots of the static evaluation cache
+threads = 1  # parallel searches, more than one runs a Lazy SMP search on a shared transposition table
+search_backend = "auto"  # "process", "thread" (free-threaded Python only), "auto" to use threads whenever the GIL is disabled, or "root_split" for reproducible fixed-depth analysis (timed searches then use "auto")
+move_overhead = 0.05  # seconds kept back from every move for communication with the GUI or lichess
+qsearch_check_plies = 1  # quiescence plies that also search quiet checking moves
+delta_margin = 200  # centipawns on top of the captured piece for delta pruning
+null_move_pruning = True
+null_move_reduction = 2  # base depth reduction R of the null move search
+null_move_verification_material = 500  # verify null move cutoffs when the side to move has at most this much non-pawn material
+late_move_reductions = True
+lmr_min_depth = 3
+lmr_min_moves = 3  # moves searched at full depth before quiet moves get reduced
+lmr_base = 0.75  # reduction = lmr_base + log(depth) * log(move_number) / lmr_divisor
+lmr_divisor = 2.25
+late_move_pruning = True
+lmp_max_depth = 3  # quiet moves after the first 3 + depth^2 are skipped up to this depth
+aspiration_window = 50  # half-width in centipawns of the first aspiration window at the root
+futility_pruning = True
+futility_margin = 150  # per ply of remaining depth, quiet moves are skipped if static eval + margin cannot reach alpha
+reverse_futility_pruning = True
+reverse_futility_margin = 120  # per ply of remaining depth, the node fails high if static eval - margin still beats beta
+razoring = True
+razoring_margin = 300  # per ply of remaining depth, nodes this far below alpha are checked with a quiescence search
+max_extensions = 4  # extension plies allowed along one path from the root
+check_extensions = True
+recapture_extensions = True
+singular_extensions = True
+singular_margin = 2  # per ply of depth, how far below its TT score the alternatives to a singular move must fail
 
 def set_global_depth(new_depth):
     global depth
@@ -42,3 +72,268 @@ def set_qDepth_restricted(bool):
 def set_qDepth_removed(bool):
     global qDepth_removed
     qDepth_removed = bool
+
+def set_tt_size_mb(size_mb):
+    global tt_size_mb
+    tt_size_mb = size_mb
+
+def get_tt_size_mb():
+    global tt_size_mb
+    return tt_size_mb
+
+def set_pawn_hash_entries(entries):
+    global pawn_hash_entries
+    pawn_hash_entries = max(1, int(entries))
+
+def get_pawn_hash_entries():
+    global pawn_hash_entries
+    return pawn_hash_entries
+
+def set_eval_cache_entries(entries):
+    global eval_cache_entries
+    eval_cache_entries = max(1, int(entries))
+
+def get_eval_cache_entries():
+    global eval_cache_entries
+    return eval_cache_entries
+
+def set_qsearch_check_plies(plies):
+    global qsearch_check_plies
+    qsearch_check_plies = plies
+
+def get_qsearch_check_plies():
+    global qsearch_check_plies
+    return qsearch_check_plies
+
+def set_delta_margin(margin):
+    global delta_margin
+    delta_margin = margin
+
+def get_delta_margin():
+    global delta_margin
+    return delta_margin
+
+def set_null_move_pruning(enabled):
+    global null_move_pruning
+    null_move_pruning = enabled
+
+def get_null_move_pruning():
+    global null_move_pruning
+    return null_move_pruning
+
+def set_null_move_reduction(reduction):
+    global null_move_reduction
+    null_move_reduction = reduction
+
+def get_null_move_reduction():
+    global null_move_reduction
+    return null_move_reduction
+
+def set_null_move_verification_material(material):
+    global null_move_verification_material
+    null_move_verification_material = material
+
+def get_null_move_verification_material():
+    global null_move_verification_material
+    return null_move_verification_material
+
+def set_late_move_reductions(enabled):
+    global late_move_reductions
+    late_move_reductions = enabled
+
+def get_late_move_reductions():
+    global late_move_reductions
+    return late_move_reductions
+
+def set_lmr_min_depth(min_depth):
+    global lmr_min_depth
+    lmr_min_depth = min_depth
+
+def get_lmr_min_depth():
+    global lmr_min_depth
+    return lmr_min_depth
+
+def set_lmr_min_moves(min_moves):
+    global lmr_min_moves
+    lmr_min_moves = min_moves
+
+def get_lmr_min_moves():
+    global lmr_min_moves
+    return lmr_min_moves
+
+def set_lmr_base(base):
+    global lmr_base
+    lmr_base = base
+
+def get_lmr_base():
+    global lmr_base
+    return lmr_base
+
+def set_lmr_divisor(divisor):
+    global lmr_divisor
+    lmr_divisor = divisor
+
+def get_lmr_divisor():
+    global lmr_divisor
+    return lmr_divisor
+
+def set_late_move_pruning(enabled):
+    global late_move_pruning
+    late_move_pruning = enabled
+
+def get_late_move_pruning():
+    global late_move_pruning
+    return late_move_pruning
+
+def set_lmp_max_depth(max_depth):
+    global lmp_max_depth
+    lmp_max_depth = max_depth
+
+def get_lmp_max_depth():
+    global lmp_max_depth
+    return lmp_max_depth
+
+def set_aspiration_window(window):
+    global aspiration_window
+    aspiration_window = window
+
+def get_aspiration_window():
+    global aspiration_window
+    return aspiration_window
+
+def set_futility_pruning(enabled):
+    global futility_pruning
+    futility_pruning = enabled
+
+def get_futility_pruning():
+    global futility_pruning
+    return futility_pruning
+
+def set_futility_margin(margin):
+    global futility_margin
+    futility_margin = margin
+
+def get_futility_margin():
+    global futility_margin
+    return futility_margin
+
+def set_reverse_futility_pruning(enabled):
+    global reverse_futility_pruning
+    reverse_futility_pruning = enabled
+
+def get_reverse_futility_pruning():
+    global reverse_futility_pruning
+    return reverse_futility_pruning
+
+def set_reverse_futility_margin(margin):
+    global reverse_futility_margin
+    reverse_futility_margin = margin
+
+def get_reverse_futility_margin():
+    global reverse_futility_margin
+    return reverse_futility_margin
+
+def set_razoring(enabled):
+    global razoring
+    razoring = enabled
+
+def get_razoring():
+    global razoring
+    return razoring
+
+def set_razoring_margin(margin):
+    global razoring_margin
+    razoring_margin = margin
+
+def get_razoring_margin():
+    global razoring_margin
+    return razoring_margin
+
+def set_max_extensions(extensions):
+    global max_extensions
+    max_extensions = extensions
+
+def get_max_extensions():
+    global max_extensions
+    return max_extensions
+
+def set_check_extensions(enabled):
+    global check_extensions
+    check_extensions = enabled
+
+def get_check_extensions():
+    global check_extensions
+    return check_extensions
+
+def set_recapture_extensions(enabled):
+    global recapture_extensions
+    recapture_extensions = enabled
+
+def get_recapture_extensions():
+    global recapture_extensions
+    return recapture_extensions
+
+def set_singular_extensions(enabled):
+    global singular_extensions
+    singular_extensions = enabled
+
+def get_singular_extensions():
+    global singular_extensions
+    return singular_extensions
+
+def set_singular_margin(margin):
+    global singular_margin
+    singular_margin = margin
+
+def get_singular_margin():
+    global singular_margin
+    return singular_margin
+
+def set_threads(count):
+    global threads
+    threads = max(1, int(count))
+
+def get_threads():
+    global threads
+    return threads
+
+def set_search_backend(backend):
+    global search_backend
+    if backend not in ("auto", "process", "thread", "root_split"):
+        raise ValueError(f"Unknown search backend: {backend}")
+    search_backend = backend
+
+def get_search_backend():
+    global search_backend
+    return search_backend
+
+def set_move_overhead(seconds):
+    global move_overhead
+    move_overhead = max(0.0, seconds)
+
+def get_move_overhead():
+    global move_overhead
+    return move_overhead
+
+# Settings read by the search. Worker processes keep the values they started with, so every task they run gets these
+# sent along (see engine/root_split.py and engine/lazy_smp.py)
+SEARCH_SETTINGS = (
+    "depth", "iterative_depth", "iterative_deepening", "qDepth", "qDepth_restricted", "qDepth_removed",
+    "qsearch_check_plies", "delta_margin", "null_move_pruning", "null_move_reduction",
+    "null_move_verification_material", "late_move_reductions", "lmr_min_depth", "lmr_min_moves", "lmr_base",
+    "lmr_divisor", "late_move_pruning", "lmp_max_depth", "aspiration_window", "futility_pruning", "futility_margin",
+    "reverse_futility_pruning", "reverse_futility_margin", "razoring", "razoring_margin", "max_extensions",
+    "check_extensions", "recapture_extensions", "singular_extensions", "singular_margin",
+)
+
+def get_search_settings():
+    """
+    The current values of SEARCH_SETTINGS, as a dict that can be sent to another process.
+    """
+    return {name: globals()[name] for name in SEARCH_SETTINGS}
+
+def set_search_settings(settings):
+    """
+    Take over settings returned by get_search_settings, e.g. in a worker process.
+    """
+    globals().update((name, settings[name]) for name in SEARCH_SETTINGS)
@@ -5,6 +5,8 @@ PHASE_OPENING = "opening"
 PHASE_MIDGAME = "midgame"
 PHASE_ENDGAME = "endgame"
 CHECKMATE_BASE_SCORE = 1000000
+# Mate scores are CHECKMATE_BASE_SCORE + (MAX_SEARCH_PLY - ply), so shorter mates score higher
+MAX_SEARCH_PLY = 256
 
 PIECE_VALUES = {
     chess.PAWN: 100,
@@ -1,4 +1,6 @@
 #counter.py
+import threading
+
 from utils.log import logger
 from utils.debug_config import get_debug_config
 
@@ -7,61 +9,72 @@ if debug_counter:
     logger.debug("Counter debug mode enabled")
 
 
-total_positions_evaluated = 0
-total_lines_pruned = 0
-curent_ply_positions_evaluated = 0
-curent_ply_lines_pruned = 0
+class CounterState(threading.local):
+    """
+    Node counters of the search running in the calling thread. Threads searching in parallel (see
+    engine/threaded_search.py) count separately and their totals are merged with add_total_counters.
+    """
+
+    def __init__(self):
+        self.total_positions_evaluated = 0
+        self.total_lines_pruned = 0
+        self.curent_ply_positions_evaluated = 0
+        self.curent_ply_lines_pruned = 0
+
+
+counters = CounterState()
 
 
 def get_total_counters():
-    global total_positions_evaluated, total_lines_pruned
-    return total_positions_evaluated, total_lines_pruned
+    return counters.total_positions_evaluated, counters.total_lines_pruned
 
 def reset_total_counters():
-    global total_positions_evaluated, total_lines_pruned, curent_ply_positions_evaluated, curent_ply_lines_pruned
-    total_positions_evaluated = 0
-    total_lines_pruned = 0
-    curent_ply_positions_evaluated = 0
-    curent_ply_lines_pruned = 0
+    counters.total_positions_evaluated = 0
+    counters.total_lines_pruned = 0
+    counters.curent_ply_positions_evaluated = 0
+    counters.curent_ply_lines_pruned = 0
     logger.debug("Counters reset")
 
+def add_total_counters(positions_evaluated, lines_pruned):
+    """
+    Add the totals counted by another thread to the totals of the calling thread.
+    """
+    counters.total_positions_evaluated += positions_evaluated
+    counters.total_lines_pruned += lines_pruned
+
 if not debug_counter:
     def update_total_counters(positions_evaluated, lines_pruned, reset_ply=False):
-        global total_positions_evaluated, total_lines_pruned, curent_ply_positions_evaluated, curent_ply_lines_pruned
-        
-        total_positions_evaluated += positions_evaluated
-        total_lines_pruned += lines_pruned
+        counters.total_positions_evaluated += positions_evaluated
+        counters.total_lines_pruned += lines_pruned
 
-        curent_ply_positions_evaluated += positions_evaluated
-        curent_ply_lines_pruned += lines_pruned
+        counters.curent_ply_positions_evaluated += positions_evaluated
+        counters.curent_ply_lines_pruned += lines_pruned
         
 
         if reset_ply:
             if debug_counter:
-                logger.debug(f"Total positions evaluated: {total_positions_evaluated}, Total lines pruned: {total_lines_pruned}")
-                logger.debug(f"Current ply positions evaluated: {curent_ply_positions_evaluated}, Current ply lines pruned: {curent_ply_lines_pruned}")
-            logger.info(f"Positions evaluated to find this move: {curent_ply_positions_evaluated}, Lines pruned: {curent_ply_lines_pruned}")
-            curent_ply_positions_evaluated = 0
-            curent_ply_lines_pruned = 0
+                logger.debug(f"Total positions evaluated: {counters.total_positions_evaluated}, Total lines pruned: {counters.total_lines_pruned}")
+                logger.debug(f"Current ply positions evaluated: {counters.curent_ply_positions_evaluated}, Current ply lines pruned: {counters.curent_ply_lines_pruned}")
+            logger.info(f"Positions evaluated to find this move: {counters.curent_ply_positions_evaluated}, Lines pruned: {counters.curent_ply_lines_pruned}")
+            counters.curent_ply_positions_evaluated = 0
+            counters.curent_ply_lines_pruned = 0
         
 else:
     def update_total_counters(positions_evaluated, lines_pruned, reset_ply=False):
-        global total_positions_evaluated, total_lines_pruned, curent_ply_positions_evaluated, curent_ply_lines_pruned, ply_counter
-        
-        total_positions_evaluated += positions_evaluated
-        total_lines_pruned += lines_pruned
+        counters.total_positions_evaluated += positions_evaluated
+        counters.total_lines_pruned += lines_pruned
 
-        curent_ply_positions_evaluated += positions_evaluated
-        curent_ply_lines_pruned += lines_pruned
+        counters.curent_ply_positions_evaluated += positions_evaluated
+        counters.curent_ply_lines_pruned += lines_pruned
         if debug_counter:
-            logger.debug(f"Total positions evaluated: {total_positions_evaluated}, Total lines pruned: {total_lines_pruned}")
-            logger.debug(f"Current ply positions evaluated: {curent_ply_positions_evaluated}, Current ply lines pruned: {curent_ply_lines_pruned}")
+            logger.debug(f"Total positions evaluated: {counters.total_positions_evaluated}, Total lines pruned: {counters.total_lines_pruned}")
+            logger.debug(f"Current ply positions evaluated: {counters.curent_ply_positions_evaluated}, Current ply lines pruned: {counters.curent_ply_lines_pruned}")
 
         
         if reset_ply:
             if debug_counter:
-                logger.debug(f"Total positions evaluated: {total_positions_evaluated}, Total lines pruned: {total_lines_pruned}")
-                logger.debug(f"Current ply positions evaluated: {curent_ply_positions_evaluated}, Current ply lines pruned: {curent_ply_lines_pruned}")
-            logger.info(f"Positions evaluated to find this move: {curent_ply_positions_evaluated}, Lines pruned: {curent_ply_lines_pruned}")
-            curent_ply_positions_evaluated = 0
-            curent_ply_lines_pruned = 0
+                logger.debug(f"Total positions evaluated: {counters.total_positions_evaluated}, Total lines pruned: {counters.total_lines_pruned}")
+                logger.debug(f"Current ply positions evaluated: {counters.curent_ply_positions_evaluated}, Current ply lines pruned: {counters.curent_ply_lines_pruned}")
+            logger.info(f"Positions evaluated to find this move: {counters.curent_ply_positions_evaluated}, Lines pruned: {counters.curent_ply_lines_pruned}")
+            counters.curent_ply_positions_evaluated = 0
+            counters.curent_ply_lines_pruned = 0
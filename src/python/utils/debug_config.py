@@ -10,6 +10,8 @@ debug_config = {
     "PST": False,
     "game_phase": False,
     "play": True,
+    "transposition_table": False,
+    "lazy_smp": False,
 }
 
 
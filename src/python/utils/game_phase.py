@@ -10,10 +10,19 @@ from utils.constants import PHASE_OPENING, PHASE_MIDGAME, PHASE_ENDGAME, PIECE_V
 debug_game_phase = get_debug_config("game_phase")
 piece_value = PIECE_VALUES
 
-
-
-# The last logged phase of the game.
-last_logged_phase = PHASE_OPENING
+# Weight of every piece type in the integer game phase, see material_and_pst_scores in engine/evaluation/PSTs.py.
+# The starting position has MAX_PHASE, a board with only kings and pawns has 0
+PHASE_WEIGHTS = {
+    chess.PAWN: 0,
+    chess.KNIGHT: 1,
+    chess.BISHOP: 1,
+    chess.ROOK: 2,
+    chess.QUEEN: 4,
+    chess.KING: 0,
+}
+MAX_PHASE = 24
+# Up to this move number the middlegame score of the evaluation is taken from the opening tables
+OPENING_MOVES = 10
 
 def count_opponents_material_no_pawns(board):
     """
@@ -30,33 +39,10 @@ def count_opponents_material_no_pawns(board):
     return opponents_material_score
 
 
-def set_last_logged_phase(phase: str) -> None:
-    """
-    Set the last logged phase of the game.
-    
-    Parameters:
-        phase: str - The phase to set.
-    """
-    global last_logged_phase
-    last_logged_phase = phase
-
-    if debug_game_phase:
-        logger.debug(f"Game phase set to: {phase}")
-
-def get_last_logged_phase() -> str:
-    """
-    Get the last logged phase of the game.
-    
-    Returns:
-        str: The last logged phase.
-    """
-    global last_logged_phase
-    return last_logged_phase
-
-
 def calculate_game_phase(board: chess.Board, opponent_material_without_pawns = None) -> str:
     """
-    Calculate the game phase based on the current board state.
+    Calculate the game phase based on the current board state. The evaluation does not use this, it interpolates
+    between the middlegame and endgame scores by the integer phase instead.
     
     Parameters:
         board: chess.Board - current board state.
@@ -71,15 +57,13 @@ def calculate_game_phase(board: chess.Board, opponent_material_without_pawns = N
 
     if opponent_material_without_pawns <= 1300:
         phase = PHASE_ENDGAME
-    elif board.fullmove_number <= 10:
+    elif board.fullmove_number <= OPENING_MOVES:
         phase = PHASE_OPENING
     else:
         phase = PHASE_MIDGAME
 
-    global last_logged_phase
-    if phase != last_logged_phase:
-        logger.info(f"Game phase changed to: {phase}")
-        last_logged_phase = phase
+    if debug_game_phase:
+        logger.debug(f"Game phase: {phase}")
 
     return phase
 